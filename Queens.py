@@ -1,20 +1,26 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from bs4 import BeautifulSoup
-import re
-from collections import defaultdict
-import matplotlib.pyplot as plt
-from matplotlib.widgets import Slider, Button
-import matplotlib.animation as animation
+# The boards, solvers and caches. Selenium, matplotlib and pytz are imported
+# where they are used, as are the process pools and the scraper, renderer
+# and generator modules, so that solving a cached board only loads the
+# modules it needs.
+from abc import ABC, abstractmethod
+from collections import defaultdict, OrderedDict, deque
 import datetime
 import os
 import time
-import pytz
+import json
+import hashlib
+import threading
+from contextlib import contextmanager
+from array import array
+import colorsys
 from pathlib import Path
 
+def pacific_date():
+    import pytz
+    pacific_tz = pytz.timezone('America/Los_Angeles')
+    date = datetime.datetime.now(pytz.utc).astimezone(pacific_tz)
+    return datetime.datetime.strftime(date, '%Y%m%d')
+
 class Cell:
     def __init__(self, id, color, row, column, status):
         self.id = id
@@ -29,7 +35,157 @@ class Cell:
     def __hash__(self):
         return hash(self.id)
     
-class Board: 
+class BaseBoard(ABC):
+    # The API the solver uses. Board keeps its state in cell sets, BitBoard
+    # and NumpyBoard in masks; available, selected and eliminated are read
+    # only snapshots on the mask boards.
+    @abstractmethod
+    def copy(self):
+        # An independent board with the same available, selected and
+        # eliminated cells.
+        pass
+
+    @abstractmethod
+    def select(self, selected_cell):
+        # Places a queen and eliminates the cells it attacks, recording both
+        # on the trail.
+        pass
+
+    @abstractmethod
+    def rollback(self, mark):
+        # Undoes every trail entry after mark, a len(self.trail) taken before
+        # the changes.
+        pass
+
+    @abstractmethod
+    def propagate_step(self):
+        # Applies one forced move. Returns (step, dead) where step describes
+        # the move or is None when nothing is forced, and dead is True when
+        # a row, column or color has no candidates left.
+        pass
+
+    @abstractmethod
+    def has_exhausted_color(self):
+        # Whether some color has no queen and no available cells.
+        pass
+
+    @abstractmethod
+    def color_counts(self):
+        # Available cells by color.
+        pass
+
+    @abstractmethod
+    def calculate_constraint_heuristic(self, selected_cell):
+        # The number of available cells of other colors a queen on
+        # selected_cell would eliminate.
+        pass
+
+    @abstractmethod
+    def get_priority_queue(self):
+        # (cell, score) pairs of the color with the fewest available cells,
+        # least constraining first.
+        pass
+
+    def color_edges(self):
+        # {color: {'north_edge', 'south_edge', 'west_edge', 'east_edge'}} for
+        # the colors that still have available cells.
+        raise NotImplementedError
+
+    def trim_row_band(self, north_edge, south_edge):
+        # Eliminates the cells of the rows north_edge to south_edge whose
+        # colors reach outside them when the colors inside fill the band.
+        # Returns (cleaned_cells, overloaded).
+        raise NotImplementedError
+
+    def trim_column_band(self, west_edge, east_edge):
+        # trim_row_band for the columns west_edge to east_edge.
+        raise NotImplementedError
+
+    def evaluate_partitions(self, fixpoint = False):
+        # Trims bands of rows or columns that colors fill exactly. Returns
+        # (cleaned_partitions, overloaded); with fixpoint, repeats until a
+        # pass trims nothing. Both kinds take their edges from the start of
+        # the pass.
+        cleaned_partitions = []
+        while True:
+            edge_dict = self.color_edges()
+            edges = {key: sorted(set([edge_dict[color][key] for color in edge_dict])) for key in ('north_edge', 'south_edge', 'west_edge', 'east_edge')}
+            pass_start = len(cleaned_partitions)
+
+            for kind, low_key, high_key, trim in (('row', 'north_edge', 'south_edge', self.trim_row_band), ('column', 'west_edge', 'east_edge', self.trim_column_band)):
+                for low_edge in edges[low_key]:
+                    for high_edge in edges[high_key]:
+                        if high_edge < low_edge:
+                            continue
+                        cleaned_cells, overloaded = trim(low_edge, high_edge)
+                        if not overloaded and len(cleaned_cells) == 0:
+                            continue
+                        partition = {'kind': kind, 'north_edge': 1, 'south_edge': self.board_size, 'west_edge': 1, 'east_edge': self.board_size, 'cleaned_cells': [] if overloaded else cleaned_cells}
+                        partition[low_key] = low_edge
+                        partition[high_key] = high_edge
+                        cleaned_partitions.append(partition)
+                        if overloaded:
+                            return cleaned_partitions, True
+
+            if not fixpoint or len(cleaned_partitions) == pass_start:
+                return cleaned_partitions, False
+
+    def forecast_state(self, selected_cell):
+        new_board = self.copy()
+        new_board.select(selected_cell)
+        return new_board
+    
+    @staticmethod
+    def extend_color_map(color_map, colors):
+        # Colors outside the LinkedIn palette (e.g. generated boards) get
+        # evenly spaced pastel hues.
+        color_map = dict(color_map)
+        missing = sorted(color for color in colors if color not in color_map)
+        for index, color in enumerate(missing):
+            red, green, blue = colorsys.hsv_to_rgb(index / len(missing), 0.35, 0.95)
+            color_map[color] = '#{:02x}{:02x}{:02x}'.format(int(red * 255), int(green * 255), int(blue * 255))
+        return color_map
+
+    def display(self, scale = 3, margin = 0.5):
+        import matplotlib.pyplot as plt
+        color_map = {
+            "Lime Yellow": "#e6f388",     
+            "Pastel Green": "#b3dfa0",    
+            "Lavender": "#c387e0",        
+            "Peach Orange": "#ffc992",    
+            "Rose Pink": "#dfa0bf",       
+            "Soft Blue": "#96beff",       
+            "Muted Teal": "#a3d2d8",      
+            "Vibrant Coral": "#ff7b60",     
+            "Light Gray": "#dfdfdf",        
+            "Warm Beige": "#b9b29e",        
+            "Bright Cyan": "#62efea"        
+        }
+        color_map = self.extend_color_map(color_map, self.colors)
+        fig, ax = plt.subplots()
+        ax.set_xticks([])
+        ax.set_yticks([])
+        ax.set_xlim(1-margin, int((len(self.cells)) ** (1/2) + 1) * scale + margin)
+        ax.set_ylim((int((len(self.cells)) ** (1/2) + 1) * scale + margin), (1-margin)) 
+        ax.set_aspect('equal')
+        for spine in ax.spines.values():
+            spine.set_visible(False)
+        for cell in self.cells:
+            ax.add_patch(plt.Rectangle(
+                (cell.column * scale, cell.row * scale),
+                1 * scale, 
+                1 * scale, 
+                facecolor=color_map[cell.color], 
+                edgecolor='black',
+                linewidth= 3 * scale/4)
+            )
+        for cell in self.selected:
+            ax.text((cell.column+0.5) * scale, (cell.row+0.5) * scale, '\u265B', fontsize=6 * scale, ha='center', va='center', color = 'gold')
+        for cell in self.eliminated:
+            ax.text((cell.column+0.5) * scale, (cell.row+0.5) * scale, '\u00D7', fontsize=2 * scale, ha='center', va='center')
+        plt.show()
+
+class Board(BaseBoard):
     def __init__(self, state):
         self.cells = [cell for state_list in state.values() for cell in state_list]
         self.available = state['available']
@@ -41,93 +197,76 @@ class Board:
         self.cell_by_color = defaultdict(set)
         self.colors = set()
         self.board_size = int(len(self.cells) ** 0.5)
+        self.trail = []
+        self.constraint_cache = dict()
         for cell in self.cells:
             self.colors.add(cell.color)
             self.cell_by_row[cell.row].add(cell)
             self.cell_by_column[cell.column].add(cell)
             self.cell_by_rowcol[(cell.row, cell.column)] = cell
             self.cell_by_color[cell.color].add(cell)
-    
-    def evaluate_partitions(self):
-        edge_dict = dict()
+        self.color_row_counts = {color: defaultdict(int) for color in self.colors}
+        self.color_column_counts = {color: defaultdict(int) for color in self.colors}
+        self.edge_dict = dict()
+        self.dirty_colors = set()
         for cell in self.available:
-            color = cell.color
-            if cell.color not in edge_dict.keys():
-                edge_dict[color] = {
-                    'north_edge': cell.row,
-                    'south_edge': cell.row,
-                    'west_edge': cell.column,
-                    'east_edge': cell.column
-                }
-            else:
-                edge_dict[color]['north_edge'] = min(edge_dict[color]['north_edge'], cell.row)
-                edge_dict[color]['south_edge'] = max(edge_dict[color]['south_edge'], cell.row)
-                edge_dict[color]['west_edge'] = min(edge_dict[color]['west_edge'], cell.column)
-                edge_dict[color]['east_edge'] = max(edge_dict[color]['east_edge'], cell.column)
-        
-        north_edges = set([edge_dict[color]['north_edge'] for color in edge_dict])
-        south_edges = set([edge_dict[color]['south_edge'] for color in edge_dict])
-        west_edges = set([edge_dict[color]['west_edge'] for color in edge_dict])
-        east_edges = set([edge_dict[color]['east_edge'] for color in edge_dict])
+            self.update_counts(cell, 1)
+
+    def update_counts(self, cell, delta):
+        self.color_row_counts[cell.color][cell.row] += delta
+        self.color_column_counts[cell.color][cell.column] += delta
+        self.dirty_colors.add(cell.color)
+
+    def refresh_edges(self):
+        for color in self.dirty_colors:
+            rows = [row for row, count in self.color_row_counts[color].items() if count > 0]
+            if len(rows) == 0:
+                self.edge_dict.pop(color, None)
+                continue
+            columns = [column for column, count in self.color_column_counts[color].items() if count > 0]
+            self.edge_dict[color] = {
+                'north_edge': min(rows),
+                'south_edge': max(rows),
+                'west_edge': min(columns),
+                'east_edge': max(columns)
+            }
+        self.dirty_colors.clear()
+
+    def trim_band(self, low_edge, high_edge, low_key, high_key, cell_by_line):
+        self.refresh_edges()
+        only_included = set()
+        for color, edges in self.edge_dict.items():
+            if edges[low_key] >= low_edge and edges[high_key] <= high_edge:
+                only_included.add(color)
+        if len(only_included) > (high_edge - low_edge + 1):
+            return [], True
+        cleaned_cells = []
+        if len(only_included) == (high_edge - low_edge + 1):
+            for line in range(low_edge, high_edge + 1):
+                for cell in cell_by_line[line]:
+                    if cell.color not in only_included and cell in self.available:
+                        cleaned_cells.append(cell)
+            cleaned_cells.sort(key=lambda cell: cell.id)
+            for cell in cleaned_cells:
+                self.eliminate(cell)
+        return cleaned_cells, False
+
+    def color_edges(self):
+        self.refresh_edges()
+        return self.edge_dict
+
+    def trim_row_band(self, north_edge, south_edge):
+        return self.trim_band(north_edge, south_edge, 'north_edge', 'south_edge', self.cell_by_row)
+
+    def trim_column_band(self, west_edge, east_edge):
+        return self.trim_band(west_edge, east_edge, 'west_edge', 'east_edge', self.cell_by_column)
+
+    def has_exhausted_color(self):
+        e_colors = set([cell.color for cell in self.eliminated])
+        s_colors = set([cell.color for cell in self.selected])
+        a_colors = set([cell.color for cell in self.available])
+        return len(e_colors.difference(s_colors, a_colors)) > 0
 
-        cleaned_partitions = []
-        for north_edge in north_edges:
-            for south_edge in south_edges:
-                if south_edge < north_edge:
-                    continue
-                included_cells = set()
-                inlcuded_colors = set()
-                excluded_colors = set()
-                for cell in self.available:
-                    if cell.row >= north_edge and cell.row <= south_edge:
-                        included_cells.add(cell)
-                        inlcuded_colors.add(cell.color)
-                    else:
-                        excluded_colors.add(cell.color)
-                only_included = inlcuded_colors.difference(excluded_colors)
-                if len(only_included) > (south_edge - north_edge + 1):
-                    cleaned_partitions.append({'north_edge': north_edge, 'south_edge': south_edge, 'west_edge': 1, 'east_edge': self.board_size, 'cleaned_cells': []})
-                    return cleaned_partitions, True
-                elif len(only_included) == (south_edge - north_edge + 1):
-                    cleaned_cells = []
-                    for cell in included_cells:
-                        if cell.color in excluded_colors:
-                            cleaned_cells.append(cell)
-                            self.eliminated.add(cell)
-                            self.available.remove(cell)
-                    if len(cleaned_cells) > 0:
-                        cleaned_partitions.append({'north_edge': north_edge, 'south_edge': south_edge, 'west_edge': 1, 'east_edge': self.board_size, 'cleaned_cells': cleaned_cells})
-        
-        for west_edge in west_edges:
-            for east_edge in east_edges:
-                if east_edge < west_edge:
-                    continue
-                included_cells = set()
-                inlcuded_colors = set()
-                excluded_colors = set()
-                for cell in self.available:
-                    if cell.column >= west_edge and cell.column <= east_edge:
-                        included_cells.add(cell)
-                        inlcuded_colors.add(cell.color)
-                    else:
-                        excluded_colors.add(cell.color)
-                only_included = inlcuded_colors.difference(excluded_colors)
-                if len(only_included) > (east_edge - west_edge + 1):
-                    cleaned_partitions.append({'north_edge': 1, 'south_edge': self.board_size, 'west_edge': west_edge, 'east_edge': east_edge, 'cleaned_cells': []})
-                    return cleaned_partitions, True
-                elif len(only_included) == (east_edge - west_edge + 1):
-                    cleaned_cells = []
-                    for cell in included_cells:
-                        if cell.color in excluded_colors:
-                            cleaned_cells.append(cell)
-                            self.eliminated.add(cell)
-                            self.available.remove(cell)
-                    if len(cleaned_cells) > 0:
-                        cleaned_partitions.append({'north_edge': 1, 'south_edge': self.board_size, 'west_edge': west_edge, 'east_edge': east_edge, 'cleaned_cells': cleaned_cells})
-
-        return cleaned_partitions, False
-                    
-                                    
     def color_counts(self):
         color_counts = defaultdict(int)
         for cell in self.available:
@@ -164,6 +303,7 @@ class Board:
                 for cell in self.available:
                     if cell.color == color:
                         candidate_cells.append(cell)
+        candidate_cells.sort(key=lambda cell: cell.id)
 
         queue = []
         for cell in candidate_cells:
@@ -183,12 +323,26 @@ class Board:
             'eliminated': self.eliminated.copy()
         }
         new_board = Board(board_state)
+        new_board.constraint_cache = self.constraint_cache
         return new_board
 
-    def forecast_state(self, selected_cell):
-        new_board = self.copy()
-        new_board.selected.add(selected_cell)
-        new_board.available.remove(selected_cell)
+    def eliminate(self, cell):
+        self.eliminated.add(cell)
+        self.available.remove(cell)
+        self.update_counts(cell, -1)
+        self.trail.append(cell)
+
+    def select(self, selected_cell):
+        self.selected.add(selected_cell)
+        self.available.remove(selected_cell)
+        self.update_counts(selected_cell, -1)
+        self.trail.append(selected_cell)
+        for cell in self.constraint_cells(selected_cell).intersection(self.available):
+            self.eliminate(cell)
+
+    def constraint_cells(self, selected_cell):
+        if selected_cell in self.constraint_cache:
+            return self.constraint_cache[selected_cell]
         sel_row = selected_cell.row
         sel_col = selected_cell.column
         constrained_cells = self.cell_by_row[sel_row].union(self.cell_by_column[sel_col]).union(self.cell_by_color[selected_cell.color])
@@ -204,122 +358,1512 @@ class Board:
         cell = self.cell_by_rowcol.get((selected_cell.row - 1, selected_cell.column + 1))
         if cell is not None:
             constrained_cells.add(cell)
-        constrained_cells = constrained_cells.intersection(self.available)
-        constrained_cells.remove(selected_cell)
-        for cell in constrained_cells:
-            new_board.eliminated.add(cell)
-            new_board.available.remove(cell)
+        constrained_cells.discard(selected_cell)
+        self.constraint_cache[selected_cell] = constrained_cells
+        return constrained_cells
+
+    def units(self):
+        units = [self.cell_by_row[row] for row in sorted(self.cell_by_row)]
+        units += [self.cell_by_column[column] for column in sorted(self.cell_by_column)]
+        units += [self.cell_by_color[color] for color in sorted(self.cell_by_color)]
+        return units
+
+    def propagate_step(self):
+        open_units = []
+        for unit in self.units():
+            if len(unit.intersection(self.selected)) > 0:
+                continue
+            unit_available = unit.intersection(self.available)
+            if len(unit_available) == 0:
+                return None, True
+            open_units.append(unit_available)
+
+        for unit_available in open_units:
+            if len(unit_available) == 1:
+                cell = next(iter(unit_available))
+                mark = len(self.trail)
+                self.select(cell)
+                return {'rule': 'single', 'selected': [cell], 'eliminated': self.trail[mark + 1:]}, False
+
+        # A cell attacked by every remaining candidate of a row, column or
+        # color can never hold a queen.
+        for unit_available in open_units:
+            dominated_cells = None
+            for candidate in unit_available:
+                if dominated_cells is None:
+                    dominated_cells = self.constraint_cells(candidate).intersection(self.available)
+                else:
+                    dominated_cells.intersection_update(self.constraint_cells(candidate))
+                if len(dominated_cells) == 0:
+                    break
+            if len(dominated_cells) > 0:
+                dominated_cells = sorted(dominated_cells, key=lambda cell: cell.id)
+                for cell in dominated_cells:
+                    self.eliminate(cell)
+                return {'rule': 'dominance', 'selected': [], 'eliminated': dominated_cells}, False
+
+        return None, False
+
+    def rollback(self, mark):
+        while len(self.trail) > mark:
+            cell = self.trail.pop()
+            if cell in self.selected:
+                self.selected.remove(cell)
+            else:
+                self.eliminated.remove(cell)
+            self.available.add(cell)
+            self.update_counts(cell, 1)
+
+class BoardMasks:
+    def __init__(self, cells):
+        self.cells = sorted(cells, key=lambda cell: (cell.row, cell.column))
+        self.board_size = int(len(self.cells) ** 0.5)
+        self.bit_by_id = {}
+        self.row_masks = defaultdict(int)
+        self.column_masks = defaultdict(int)
+        self.color_masks = defaultdict(int)
+        bit_by_rowcol = {}
+        for index, cell in enumerate(self.cells):
+            bit = 1 << index
+            self.bit_by_id[cell.id] = bit
+            self.row_masks[cell.row] |= bit
+            self.column_masks[cell.column] |= bit
+            self.color_masks[cell.color] |= bit
+            bit_by_rowcol[(cell.row, cell.column)] = bit
+        self.colors = set(self.color_masks.keys())
+        self.unit_masks = [self.row_masks[row] for row in sorted(self.row_masks)]
+        self.unit_masks += [self.column_masks[column] for column in sorted(self.column_masks)]
+        self.unit_masks += [self.color_masks[color] for color in sorted(self.color_masks)]
+
+        self.rows = sorted(self.row_masks.keys())
+        self.columns = sorted(self.column_masks.keys())
+        self.rows_before, self.rows_through = self.prefix_masks(self.rows, self.row_masks)
+        self.columns_before, self.columns_through = self.prefix_masks(self.columns, self.column_masks)
+
+        # Per cell: every cell a queen here rules out, and the subset that
+        # belongs to other colors (the constraint heuristic's score).
+        self.constraint_masks = []
+        self.heuristic_masks = []
+        for index, cell in enumerate(self.cells):
+            neighbors = 0
+            for row_offset, column_offset in ((1, 1), (-1, -1), (1, -1), (-1, 1)):
+                neighbors |= bit_by_rowcol.get((cell.row + row_offset, cell.column + column_offset), 0)
+            lines = self.row_masks[cell.row] | self.column_masks[cell.column] | neighbors
+            self.constraint_masks.append((lines | self.color_masks[cell.color]) & ~(1 << index))
+            self.heuristic_masks.append(lines & ~self.color_masks[cell.color])
+
+    @staticmethod
+    def prefix_masks(keys, masks):
+        before = {}
+        through = {}
+        running = 0
+        for key in keys:
+            before[key] = running
+            running |= masks[key]
+            through[key] = running
+        return before, through
+
+    def row_band(self, north_edge, south_edge):
+        return self.rows_through[south_edge] & ~self.rows_before[north_edge]
+
+    def column_band(self, west_edge, east_edge):
+        return self.columns_through[east_edge] & ~self.columns_before[west_edge]
+
+    def to_mask(self, cells):
+        mask = 0
+        for cell in cells:
+            mask |= self.bit_by_id[cell.id]
+        return mask
+
+    def to_cells(self, mask):
+        cells = []
+        while mask:
+            low_bit = mask & -mask
+            cells.append(self.cells[low_bit.bit_length() - 1])
+            mask ^= low_bit
+        return cells
+
+class BitBoard(BaseBoard):
+    def __init__(self, state, masks = None):
+        if masks is None:
+            masks = BoardMasks([cell for state_list in state.values() for cell in state_list])
+        self.masks = masks
+        self.cells = masks.cells
+        self.colors = masks.colors
+        self.board_size = masks.board_size
+        self.available_mask = masks.to_mask(state['available'])
+        self.selected_mask = masks.to_mask(state['selected'])
+        self.eliminated_mask = masks.to_mask(state['eliminated'])
+        self.trail = []
+
+    @property
+    def available(self):
+        return frozenset(self.masks.to_cells(self.available_mask))
+
+    @property
+    def selected(self):
+        return frozenset(self.masks.to_cells(self.selected_mask))
+
+    @property
+    def eliminated(self):
+        return frozenset(self.masks.to_cells(self.eliminated_mask))
+
+    def has_exhausted_color(self):
+        open_mask = self.available_mask | self.selected_mask
+        for color_mask in self.masks.color_masks.values():
+            if not color_mask & open_mask:
+                return True
+        return False
+
+    def color_edges(self):
+        edge_dict = dict()
+        for color, color_mask in self.masks.color_masks.items():
+            available = color_mask & self.available_mask
+            if not available:
+                continue
+            cells = self.masks.cells
+            west_edge = next(column for column in self.masks.columns if available & self.masks.column_masks[column])
+            east_edge = next(column for column in reversed(self.masks.columns) if available & self.masks.column_masks[column])
+            edge_dict[color] = {
+                'north_edge': cells[(available & -available).bit_length() - 1].row,
+                'south_edge': cells[available.bit_length() - 1].row,
+                'west_edge': west_edge,
+                'east_edge': east_edge
+            }
+        return edge_dict
+
+    def trim_band(self, band_mask, band_size):
+        only_included = 0
+        excluded_mask = 0
+        for color_mask in self.masks.color_masks.values():
+            available = color_mask & self.available_mask
+            if not available:
+                continue
+            if available & ~band_mask:
+                excluded_mask |= color_mask
+            else:
+                only_included += 1
+        if only_included > band_size:
+            return None, True
+        if only_included == band_size:
+            cleaned_mask = band_mask & excluded_mask & self.available_mask
+            if cleaned_mask:
+                self.trail.append((self.available_mask, self.selected_mask, self.eliminated_mask))
+                self.available_mask &= ~cleaned_mask
+                self.eliminated_mask |= cleaned_mask
+            return self.masks.to_cells(cleaned_mask), False
+        return [], False
+
+    def trim_row_band(self, north_edge, south_edge):
+        return self.trim_band(self.masks.row_band(north_edge, south_edge), south_edge - north_edge + 1)
+
+    def trim_column_band(self, west_edge, east_edge):
+        return self.trim_band(self.masks.column_band(west_edge, east_edge), east_edge - west_edge + 1)
+
+    def color_counts(self):
+        color_counts = dict()
+        for color, color_mask in self.masks.color_masks.items():
+            count = (color_mask & self.available_mask).bit_count()
+            if count > 0:
+                color_counts[color] = count
+        return color_counts
+
+    def calculate_constraint_heuristic(self, selected_cell):
+        index = self.masks.bit_by_id[selected_cell.id].bit_length() - 1
+        return (self.masks.heuristic_masks[index] & self.available_mask).bit_count()
+
+    def get_priority_queue(self):
+        color_counts = self.color_counts()
+        min_count = min(color_counts.values())
+        candidate_mask = 0
+        for color, count in color_counts.items():
+            if count == min_count:
+                candidate_mask |= self.masks.color_masks[color]
+
+        queue = []
+        for cell in self.masks.to_cells(candidate_mask & self.available_mask):
+            score = self.calculate_constraint_heuristic(cell)
+            queue.append((cell, score))
+
+        queue = sorted(queue, key=lambda x: x[1], reverse=False)
+        selected_color = queue[0][0].color
+        queue = [(cell, score) for cell, score in queue if cell.color == selected_color]
+
+        return queue
+
+    def copy(self):
+        new_board = BitBoard.__new__(BitBoard)
+        new_board.masks = self.masks
+        new_board.cells = self.cells
+        new_board.colors = self.colors
+        new_board.board_size = self.board_size
+        new_board.available_mask = self.available_mask
+        new_board.selected_mask = self.selected_mask
+        new_board.eliminated_mask = self.eliminated_mask
+        new_board.trail = []
         return new_board
-    
-    def display(self, scale = 3, margin = 0.5):
-        color_map = {
-            "Lime Yellow": "#e6f388",     
-            "Pastel Green": "#b3dfa0",    
-            "Lavender": "#c387e0",        
-            "Peach Orange": "#ffc992",    
-            "Rose Pink": "#dfa0bf",       
-            "Soft Blue": "#96beff",       
-            "Muted Teal": "#a3d2d8",      
-            "Vibrant Coral": "#ff7b60",     
-            "Light Gray": "#dfdfdf",        
-            "Warm Beige": "#b9b29e",        
-            "Bright Cyan": "#62efea"        
-        }
-        fig, ax = plt.subplots()
-        ax.set_xticks([])
-        ax.set_yticks([])
-        ax.set_xlim(1-margin, int((len(self.cells)) ** (1/2) + 1) * scale + margin)
-        ax.set_ylim((int((len(self.cells)) ** (1/2) + 1) * scale + margin), (1-margin)) 
-        ax.set_aspect('equal')
-        for spine in ax.spines.values():
-            spine.set_visible(False)
+
+    def select(self, selected_cell):
+        self.trail.append((self.available_mask, self.selected_mask, self.eliminated_mask))
+        bit = self.masks.bit_by_id[selected_cell.id]
+        constrained_mask = self.masks.constraint_masks[bit.bit_length() - 1] & self.available_mask
+        self.selected_mask |= bit
+        self.available_mask &= ~(constrained_mask | bit)
+        self.eliminated_mask |= constrained_mask
+
+    def propagate_step(self):
+        open_units = []
+        for unit_mask in self.masks.unit_masks:
+            if unit_mask & self.selected_mask:
+                continue
+            unit_available = unit_mask & self.available_mask
+            if not unit_available:
+                return None, True
+            open_units.append(unit_available)
+
+        for unit_available in open_units:
+            if unit_available & (unit_available - 1) == 0:
+                cell = self.masks.cells[unit_available.bit_length() - 1]
+                eliminated_mask = self.eliminated_mask
+                self.select(cell)
+                return {'rule': 'single', 'selected': [cell], 'eliminated': self.masks.to_cells(self.eliminated_mask & ~eliminated_mask)}, False
+
+        # A cell attacked by every remaining candidate of a row, column or
+        # color can never hold a queen.
+        for unit_available in open_units:
+            dominated_mask = self.available_mask
+            candidates = unit_available
+            while candidates and dominated_mask:
+                low_bit = candidates & -candidates
+                dominated_mask &= self.masks.constraint_masks[low_bit.bit_length() - 1]
+                candidates ^= low_bit
+            if dominated_mask:
+                self.trail.append((self.available_mask, self.selected_mask, self.eliminated_mask))
+                self.available_mask &= ~dominated_mask
+                self.eliminated_mask |= dominated_mask
+                return {'rule': 'dominance', 'selected': [], 'eliminated': self.masks.to_cells(dominated_mask)}, False
+
+        return None, False
+
+    def rollback(self, mark):
+        if len(self.trail) > mark:
+            self.available_mask, self.selected_mask, self.eliminated_mask = self.trail[mark]
+            del self.trail[mark:]
+
+class BoardArrays:
+    def __init__(self, cells):
+        # NumPy is imported once per board layout and kept here, so the
+        # boards sharing these arrays reach it without another import.
+        import numpy as np
+        self.np = np
+        self.cells = sorted(cells, key=lambda cell: (cell.row, cell.column))
+        self.board_size = int(len(self.cells) ** 0.5)
+        self.colors = set(cell.color for cell in self.cells)
+        self.color_names = sorted(self.colors)
+        self.rows = sorted(set(cell.row for cell in self.cells))
+        self.columns = sorted(set(cell.column for cell in self.cells))
+        self.index_by_id = {cell.id: index for index, cell in enumerate(self.cells)}
+        color_index = {color: index for index, color in enumerate(self.color_names)}
+        size = self.board_size
+
+        self.color_grid = np.array([color_index[cell.color] for cell in self.cells], dtype=np.intp).reshape(size, size)
+        self.cell_colors = self.color_grid.ravel()
+        self.row_of = np.repeat(np.arange(size), size)
+        self.column_of = np.tile(np.arange(size), size)
+        self.color_members = self.cell_colors[None, :] == np.arange(len(self.color_names))[:, None]
+        self.unit_members = np.concatenate([
+            self.row_of[None, :] == np.arange(size)[:, None],
+            self.column_of[None, :] == np.arange(size)[:, None],
+            self.color_members
+        ])
+
+        # Row n of each matrix is every cell a queen on cell n rules out,
+        # and the subset of other colors that the heuristic scores.
+        same_row = self.row_of[:, None] == self.row_of[None, :]
+        same_column = self.column_of[:, None] == self.column_of[None, :]
+        touching = (np.abs(self.row_of[:, None] - self.row_of[None, :]) == 1) & (np.abs(self.column_of[:, None] - self.column_of[None, :]) == 1)
+        same_color = self.cell_colors[:, None] == self.cell_colors[None, :]
+        lines = same_row | same_column | touching
+        self.constraint_matrix = lines | same_color
+        np.fill_diagonal(self.constraint_matrix, False)
+        self.heuristic_matrix = lines & ~same_color
+        # The constraint matrix as floats so that counting the candidates
+        # of every unit that attack each cell is one matrix product.
+        self.constraint_weights = self.constraint_matrix.astype(np.float32)
+
+    def to_mask(self, cells):
+        mask = self.np.zeros(len(self.cells), dtype=bool)
+        mask[[self.index_by_id[cell.id] for cell in cells]] = True
+        return mask
+
+    def to_cells(self, mask):
+        return [self.cells[index] for index in self.np.flatnonzero(mask)]
+
+class NumpyBoard(BaseBoard):
+    def __init__(self, state, arrays = None):
+        if arrays is None:
+            arrays = BoardArrays([cell for state_list in state.values() for cell in state_list])
+        np = arrays.np
+        self.arrays = arrays
+        self.cells = arrays.cells
+        self.colors = arrays.colors
+        self.board_size = arrays.board_size
+        # One array holds the available, selected and eliminated masks so a
+        # trail entry is a single copy.
+        self.state = np.stack([arrays.to_mask(state['available']), arrays.to_mask(state['selected']), arrays.to_mask(state['eliminated'])])
+        self.trail = []
+
+    @property
+    def available_mask(self):
+        return self.state[0]
+
+    @property
+    def selected_mask(self):
+        return self.state[1]
+
+    @property
+    def eliminated_mask(self):
+        return self.state[2]
+
+    @property
+    def available(self):
+        return frozenset(self.arrays.to_cells(self.available_mask))
+
+    @property
+    def selected(self):
+        return frozenset(self.arrays.to_cells(self.selected_mask))
+
+    @property
+    def eliminated(self):
+        return frozenset(self.arrays.to_cells(self.eliminated_mask))
+
+    def has_exhausted_color(self):
+        np = self.arrays.np
+        open_mask = self.available_mask | self.selected_mask
+        open_counts = np.bincount(self.arrays.cell_colors[open_mask], minlength=len(self.arrays.color_names))
+        return bool((open_counts == 0).any())
+
+    def color_extents(self, kind):
+        # First and last row (or column) of each color that still has
+        # available cells, as positions into arrays.rows (or arrays.columns).
+        np = self.arrays.np
+        size = self.board_size
+        grids = (self.arrays.color_members & self.available_mask).reshape(-1, size, size)
+        presence = grids.any(axis=2) if kind == 'row' else grids.any(axis=1)
+        present = presence.any(axis=1)
+        presence = presence[present]
+        lows = presence.argmax(axis=1)
+        highs = size - 1 - presence[:, ::-1].argmax(axis=1)
+        return lows, highs, np.flatnonzero(present)
+
+    def partition(self, kind, low_edge, high_edge, cleaned_cells):
+        if kind == 'row':
+            return {'kind': 'row', 'north_edge': self.arrays.rows[low_edge], 'south_edge': self.arrays.rows[high_edge], 'west_edge': 1, 'east_edge': self.board_size, 'cleaned_cells': cleaned_cells}
+        return {'kind': 'column', 'north_edge': 1, 'south_edge': self.board_size, 'west_edge': self.arrays.columns[low_edge], 'east_edge': self.arrays.columns[high_edge], 'cleaned_cells': cleaned_cells}
+
+    def trim_bands(self, kind, low_edges, high_edges, cleaned_partitions, extents = None):
+        # Every band between a low and a high edge is checked at once; the
+        # counts are only recomputed after a band actually trims cells.
+        # extents, when given, are the current color extents.
+        np = self.arrays.np
+        line_of = self.arrays.row_of if kind == 'row' else self.arrays.column_of
+        band_sizes = high_edges[None, :] - low_edges[:, None] + 1
+        position = -1
+        while True:
+            lows, highs, present = extents if extents is not None else self.color_extents(kind)
+            extents = None
+            inside = (lows >= low_edges[:, None, None]) & (highs <= high_edges[None, :, None])
+            counts = inside.sum(axis=2)
+            flagged = np.flatnonzero(((band_sizes > 0) & (counts >= band_sizes)).ravel())
+            trimmed = False
+            for position in flagged[flagged > position]:
+                low, high = divmod(int(position), len(high_edges))
+                low_edge, high_edge = int(low_edges[low]), int(high_edges[high])
+                if counts[low, high] > band_sizes[low, high]:
+                    cleaned_partitions.append(self.partition(kind, low_edge, high_edge, []))
+                    return True
+                included = np.zeros(len(self.arrays.color_names), dtype=bool)
+                included[present[inside[low, high]]] = True
+                cleaned_mask = (line_of >= low_edge) & (line_of <= high_edge) & self.available_mask & ~included[self.arrays.cell_colors]
+                if cleaned_mask.any():
+                    self.trail.append(self.state.copy())
+                    self.available_mask[cleaned_mask] = False
+                    self.eliminated_mask[cleaned_mask] = True
+                    cleaned_partitions.append(self.partition(kind, low_edge, high_edge, self.arrays.to_cells(cleaned_mask)))
+                    trimmed = True
+                    break
+            if not trimmed:
+                return False
+
+    def evaluate_partitions(self, fixpoint = False):
+        # Checks every band of a kind at once instead of going through the
+        # per-band hooks.
+        np = self.arrays.np
+        cleaned_partitions = []
+        while True:
+            # Both kinds take their edges from the start of the pass, as on
+            # Board, so column extents are only reused if no row was trimmed.
+            row_extents = self.color_extents('row')
+            column_extents = self.color_extents('column')
+            pass_start = len(cleaned_partitions)
+            if self.trim_bands('row', np.unique(row_extents[0]), np.unique(row_extents[1]), cleaned_partitions, row_extents):
+                return cleaned_partitions, True
+            current = column_extents if len(cleaned_partitions) == pass_start else None
+            if self.trim_bands('column', np.unique(column_extents[0]), np.unique(column_extents[1]), cleaned_partitions, current):
+                return cleaned_partitions, True
+            if not fixpoint or len(cleaned_partitions) == pass_start:
+                return cleaned_partitions, False
+
+    def color_counts(self):
+        np = self.arrays.np
+        counts = np.bincount(self.arrays.cell_colors[self.available_mask], minlength=len(self.arrays.color_names))
+        return {self.arrays.color_names[color]: int(counts[color]) for color in np.flatnonzero(counts)}
+
+    def calculate_constraint_heuristic(self, selected_cell):
+        np = self.arrays.np
+        index = self.arrays.index_by_id[selected_cell.id]
+        return int(np.count_nonzero(self.arrays.heuristic_matrix[index] & self.available_mask))
+
+    def get_priority_queue(self):
+        np = self.arrays.np
+        cell_colors = self.arrays.cell_colors
+        counts = np.bincount(cell_colors[self.available_mask], minlength=len(self.arrays.color_names))
+        min_count = counts[counts > 0].min()
+        candidates = np.flatnonzero(self.available_mask & (counts[cell_colors] == min_count))
+        scores = np.count_nonzero(self.arrays.heuristic_matrix[candidates] & self.available_mask, axis=1)
+        order = np.argsort(scores, kind='stable')
+        candidates = candidates[order]
+        scores = scores[order]
+        keep = cell_colors[candidates] == cell_colors[candidates[0]]
+        return [(self.arrays.cells[index], int(score)) for index, score in zip(candidates[keep], scores[keep])]
+
+    def copy(self):
+        new_board = NumpyBoard.__new__(NumpyBoard)
+        new_board.arrays = self.arrays
+        new_board.cells = self.cells
+        new_board.colors = self.colors
+        new_board.board_size = self.board_size
+        new_board.state = self.state.copy()
+        new_board.trail = []
+        return new_board
+
+    def select(self, selected_cell):
+        self.trail.append(self.state.copy())
+        index = self.arrays.index_by_id[selected_cell.id]
+        constrained_mask = self.arrays.constraint_matrix[index] & self.available_mask
+        self.selected_mask[index] = True
+        self.available_mask[index] = False
+        self.available_mask[constrained_mask] = False
+        self.eliminated_mask[constrained_mask] = True
+
+    def propagate_step(self):
+        np = self.arrays.np
+        unit_members = self.arrays.unit_members
+        open_units = ~(unit_members & self.selected_mask).any(axis=1)
+        unit_available = unit_members[open_units] & self.available_mask
+        unit_counts = np.count_nonzero(unit_available, axis=1)
+        if (unit_counts == 0).any():
+            return None, True
+
+        singles = np.flatnonzero(unit_counts == 1)
+        if len(singles) > 0:
+            cell = self.arrays.cells[np.flatnonzero(unit_available[singles[0]])[0]]
+            eliminated_mask = self.eliminated_mask.copy()
+            self.select(cell)
+            return {'rule': 'single', 'selected': [cell], 'eliminated': self.arrays.to_cells(self.eliminated_mask & ~eliminated_mask)}, False
+
+        # A cell attacked by every remaining candidate of a row, column or
+        # color can never hold a queen. Counting the attacking candidates of
+        # each unit with one matrix product checks every unit at once.
+        attacks = unit_available.astype(np.float32) @ self.arrays.constraint_weights
+        dominated = (attacks == unit_counts[:, None]) & self.available_mask
+        units = np.flatnonzero(dominated.any(axis=1))
+        if len(units) > 0:
+            dominated_mask = dominated[units[0]]
+            self.trail.append(self.state.copy())
+            self.available_mask[dominated_mask] = False
+            self.eliminated_mask[dominated_mask] = True
+            return {'rule': 'dominance', 'selected': [], 'eliminated': self.arrays.to_cells(dominated_mask)}, False
+
+        return None, False
+
+    def rollback(self, mark):
+        if len(self.trail) > mark:
+            self.state[:] = self.trail[mark]
+            del self.trail[mark:]
+
+# Board implementations by the names the command line tools accept.
+BOARD_TYPES = {'board': Board, 'bitboard': BitBoard, 'numpy': NumpyBoard}
+
+class DancingLinks:
+    def __init__(self, cells, available = None, selected = ()):
+        self.cells = sorted(cells, key=lambda cell: cell.id)
+        if available is None:
+            available = self.cells
+        candidates = sorted(set(available).union(selected), key=lambda cell: cell.id)
+        self.nodes = 0
+        self.on_node = None
+
+        # Exactly one queen per row, column and color (primary columns) and
+        # at most one per 2x2 window, which covers every touching pair
+        # (secondary columns).
+        primary = dict()
         for cell in self.cells:
-            ax.add_patch(plt.Rectangle(
-                (cell.column * scale, cell.row * scale),
-                1 * scale, 
-                1 * scale, 
-                facecolor=color_map[cell.color], 
-                edgecolor='black',
-                linewidth= 3 * scale/4)
-            )
-        for cell in self.selected:
-            ax.text((cell.column+0.5) * scale, (cell.row+0.5) * scale, '\u265B', fontsize=6 * scale, ha='center', va='center', color = 'gold')
-        for cell in self.eliminated:
-            ax.text((cell.column+0.5) * scale, (cell.row+0.5) * scale, '\u00D7', fontsize=2 * scale, ha='center', va='center')
-        plt.show()
+            for key in (('row', cell.row), ('column', cell.column), ('color', cell.color)):
+                primary[key] = None
+        primary = list(primary)
+        window_counts = defaultdict(int)
+        for cell in self.cells:
+            for window in self.cell_windows(cell):
+                window_counts[window] += 1
+        secondary = [window for window in sorted(window_counts) if window_counts[window] > 1]
+
+        column_count = len(primary) + len(secondary)
+        self.left = list(range(-1, column_count))
+        self.right = list(range(1, column_count + 2))
+        self.left[0] = len(primary)
+        self.right[len(primary)] = 0
+        for column in range(len(primary) + 1, column_count + 1):
+            self.left[column] = column
+            self.right[column] = column
+        self.up = list(range(column_count + 1))
+        self.down = list(range(column_count + 1))
+        self.column = list(range(column_count + 1))
+        self.size = [0] * (column_count + 1)
+        self.row_cell = [None] * (column_count + 1)
+        self.first_node = {}
+
+        column_by_key = {key: index + 1 for index, key in enumerate(primary + secondary)}
+        for cell in candidates:
+            keys = [('row', cell.row), ('column', cell.column), ('color', cell.color)]
+            keys += [window for window in self.cell_windows(cell) if window in column_by_key]
+            first = len(self.column)
+            for offset, key in enumerate(keys):
+                header = column_by_key[key]
+                node = first + offset
+                self.column.append(header)
+                self.row_cell.append(cell)
+                self.up.append(self.up[header])
+                self.down.append(header)
+                self.down[self.up[header]] = node
+                self.up[header] = node
+                self.size[header] += 1
+                self.left.append(node - 1 if offset > 0 else first + len(keys) - 1)
+                self.right.append(node + 1 if offset < len(keys) - 1 else first)
+            self.first_node[cell] = first
+
+        self.partial = []
+        for cell in selected:
+            self.select(cell)
+
+    @staticmethod
+    def cell_windows(cell):
+        return [('window', cell.row + row_offset, cell.column + column_offset) for row_offset in (-1, 0) for column_offset in (-1, 0)]
+
+    def cover(self, header):
+        self.right[self.left[header]] = self.right[header]
+        self.left[self.right[header]] = self.left[header]
+        i = self.down[header]
+        while i != header:
+            j = self.right[i]
+            while j != i:
+                self.up[self.down[j]] = self.up[j]
+                self.down[self.up[j]] = self.down[j]
+                self.size[self.column[j]] -= 1
+                j = self.right[j]
+            i = self.down[i]
+
+    def uncover(self, header):
+        i = self.up[header]
+        while i != header:
+            j = self.left[i]
+            while j != i:
+                self.size[self.column[j]] += 1
+                self.up[self.down[j]] = j
+                self.down[self.up[j]] = j
+                j = self.left[j]
+            i = self.up[i]
+        self.right[self.left[header]] = header
+        self.left[self.right[header]] = header
+
+    def select(self, cell):
+        node = self.first_node[cell]
+        self.partial.append(cell)
+        self.cover(self.column[node])
+        j = self.right[node]
+        while j != node:
+            self.cover(self.column[j])
+            j = self.right[j]
+
+    def search(self, limit):
+        if self.right[0] == 0:
+            if len(self.solutions) < self.keep_solutions:
+                self.solutions.append(list(self.partial))
+            self.solution_count += 1
+            return
+        if self.on_node is not None:
+            self.on_node(self.nodes)
+        self.nodes += 1
+
+        header = self.right[0]
+        best = header
+        while header != 0:
+            if self.size[header] < self.size[best]:
+                best = header
+            header = self.right[header]
+        if self.size[best] == 0:
+            return
+
+        self.cover(best)
+        i = self.down[best]
+        while i != best:
+            self.partial.append(self.row_cell[i])
+            j = self.right[i]
+            while j != i:
+                self.cover(self.column[j])
+                j = self.right[j]
+            self.search(limit)
+            j = self.left[i]
+            while j != i:
+                self.uncover(self.column[j])
+                j = self.left[j]
+            self.partial.pop()
+            if limit is not None and self.solution_count >= limit:
+                break
+            i = self.down[i]
+        self.uncover(best)
+
+    def find_solutions(self, limit = None):
+        self.solutions = []
+        self.keep_solutions = limit if limit is not None else float('inf')
+        self.solution_count = 0
+        self.search(limit)
+        return self.solutions
+
+    def solve(self):
+        solutions = self.find_solutions(1)
+        if solutions:
+            return solutions[0]
+        return None
+
+    def count_solutions(self, limit = None):
+        self.solutions = []
+        self.keep_solutions = 0
+        self.solution_count = 0
+        self.search(limit)
+        return self.solution_count
+
+class MoveHistory():
+    # Search history as a delta log. Each frame stores its status and the
+    # cell ids that entered or left the selected and eliminated sets since
+    # the previous frame, with a full keyframe every keyframe_interval
+    # frames so any frame can be rebuilt without replaying the whole log.
+    # Past limit frames the newest frame replaces the last one kept, so a
+    # truncated history still ends on the final board. A stream given as a
+    # path is opened on the first frame and closed by close().
+    SELECT, UNSELECT, ELIMINATE, UNELIMINATE = range(4)
+
+    def __init__(self, keyframe_interval = 256, limit = None, stream = None):
+        self.keyframe_interval = keyframe_interval
+        self.limit = limit
+        self.cell_by_id = {}
+        self.statuses = array('b')
+        self.delta_starts = array('l', [0])
+        self.deltas = array('l')
+        self.partitions = {}
+        self.keyframes = []
+        self.selected_ids = set()
+        self.eliminated_ids = set()
+        self.dropped = 0
+        self.tail_base = None
+        self.cursor = None
+        self.stream_path = stream if isinstance(stream, (str, Path)) else None
+        self.stream = None if self.stream_path is not None else stream
+        self.stream_opened = False
+
+    def __len__(self):
+        return len(self.statuses)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def frame_deltas(self, old_selected, old_eliminated, selected_ids, eliminated_ids):
+        deltas = [(cell_id << 2) | self.SELECT for cell_id in selected_ids - old_selected]
+        deltas += [(cell_id << 2) | self.UNSELECT for cell_id in old_selected - selected_ids]
+        deltas += [(cell_id << 2) | self.ELIMINATE for cell_id in eliminated_ids - old_eliminated]
+        deltas += [(cell_id << 2) | self.UNELIMINATE for cell_id in old_eliminated - eliminated_ids]
+        return deltas
+
+    def write_frame(self, frame):
+        if self.stream is None:
+            # A later search on the same solver appends to the file.
+            self.stream = open(self.stream_path, 'a' if self.stream_opened else 'w')
+            self.stream_opened = True
+        self.stream.write(json.dumps(frame) + '\n')
+
+    def drop_last(self):
+        move_number = len(self) - 1
+        del self.deltas[self.delta_starts[move_number]:]
+        self.delta_starts.pop()
+        self.statuses.pop()
+        self.partitions.pop(move_number, None)
+        if move_number % self.keyframe_interval == 0:
+            self.keyframes.pop()
+        self.cursor = None
+
+    def record(self, board, status, partition = None):
+        if len(self.cell_by_id) == 0:
+            self.cell_by_id = {cell.id: cell for cell in board.cells}
+        selected_ids = set(cell.id for cell in board.selected)
+        if partition is None:
+            eliminated_ids = set(cell.id for cell in board.eliminated)
+        else:
+            # Partition frames show the cells they cleaned on top of the last
+            # full frame, the board itself is carried by the next frame.
+            eliminated_ids = self.eliminated_ids
+
+        deltas = self.frame_deltas(self.selected_ids, self.eliminated_ids, selected_ids, eliminated_ids)
+        self.selected_ids = selected_ids
+        self.eliminated_ids = eliminated_ids
+        if partition is not None:
+            partition = dict(partition, cleaned_cells=[cell.id for cell in partition['cleaned_cells']])
+
+        if self.stream is not None or self.stream_path is not None:
+            frame = {'status': status, 'deltas': deltas}
+            if partition is not None:
+                frame['partition_data'] = partition
+            self.write_frame(frame)
+
+        if self.limit is not None and len(self) >= self.limit:
+            # The last kept frame is rebuilt from the frame before it.
+            self.dropped += 1
+            if self.tail_base is None:
+                self.tail_base = tuple(set(ids) for ids in self.state_at(len(self) - 2)) if len(self) > 1 else (set(), set())
+            self.drop_last()
+            deltas = self.frame_deltas(*self.tail_base, selected_ids, eliminated_ids)
+        move_number = len(self)
+        if move_number % self.keyframe_interval == 0:
+            self.keyframes.append((array('l', sorted(selected_ids)), array('l', sorted(eliminated_ids))))
+        self.statuses.append(status)
+        self.deltas.extend(deltas)
+        self.delta_starts.append(len(self.deltas))
+        if partition is not None:
+            self.partitions[move_number] = partition
+
+    def apply(self, move_number, selected_ids, eliminated_ids):
+        for delta in self.deltas[self.delta_starts[move_number]:self.delta_starts[move_number + 1]]:
+            cell_id, kind = delta >> 2, delta & 3
+            if kind == self.SELECT:
+                selected_ids.add(cell_id)
+            elif kind == self.UNSELECT:
+                selected_ids.discard(cell_id)
+            elif kind == self.ELIMINATE:
+                eliminated_ids.add(cell_id)
+            else:
+                eliminated_ids.discard(cell_id)
+
+    def state_at(self, move_number):
+        # Replay from the cursor when moving forward, otherwise from the
+        # nearest keyframe.
+        keyframe_number = move_number - move_number % self.keyframe_interval
+        if self.cursor is not None and keyframe_number <= self.cursor[0] <= move_number:
+            start, selected_ids, eliminated_ids = self.cursor
+            start += 1
+        else:
+            selected, eliminated = self.keyframes[keyframe_number // self.keyframe_interval]
+            selected_ids, eliminated_ids = set(selected), set(eliminated)
+            start = keyframe_number + 1
+        for number in range(start, move_number + 1):
+            self.apply(number, selected_ids, eliminated_ids)
+        self.cursor = (move_number, selected_ids, eliminated_ids)
+        return selected_ids, eliminated_ids
+
+    def __getitem__(self, move_number):
+        if move_number < 0:
+            move_number += len(self)
+        if not 0 <= move_number < len(self):
+            raise IndexError(move_number)
+        selected_ids, eliminated_ids = self.state_at(move_number)
+        frame = {
+            'selected': set(self.cell_by_id[cell_id] for cell_id in selected_ids),
+            'eliminated': set(self.cell_by_id[cell_id] for cell_id in eliminated_ids),
+            'status': self.statuses[move_number]
+        }
+        if move_number in self.partitions:
+            partition = self.partitions[move_number]
+            frame['partition_data'] = dict(partition, cleaned_cells=[self.cell_by_id[cell_id] for cell_id in partition['cleaned_cells']])
+            frame['previously_cleaned'] = set()
+            previous_move_number = move_number - 1
+            while previous_move_number in self.partitions:
+                frame['previously_cleaned'].update(self.cell_by_id[cell_id] for cell_id in self.partitions[previous_move_number]['cleaned_cells'])
+                previous_move_number -= 1
+        return frame
+
+    def __iter__(self):
+        for move_number in range(len(self)):
+            yield self[move_number]
+
+    def close(self):
+        # Streams passed in as files belong to the caller and are only
+        # flushed.
+        if self.stream is None:
+            return
+        if self.stream_path is None:
+            self.stream.flush()
+        else:
+            self.stream.close()
+            self.stream = None
+
+    @staticmethod
+    def load(path, cells, keyframe_interval = 256):
+        move_history = MoveHistory(keyframe_interval)
+        move_history.cell_by_id = {cell.id: cell for cell in cells}
+        with open(path, 'r') as file:
+            for line in file:
+                frame = json.loads(line)
+                move_number = len(move_history)
+                move_history.statuses.append(frame['status'])
+                move_history.deltas.extend(frame['deltas'])
+                move_history.delta_starts.append(len(move_history.deltas))
+                if 'partition_data' in frame:
+                    move_history.partitions[move_number] = frame['partition_data']
+                move_history.apply(move_number, move_history.selected_ids, move_history.eliminated_ids)
+                if move_number % keyframe_interval == 0:
+                    move_history.keyframes.append((array('l', sorted(move_history.selected_ids)), array('l', sorted(move_history.eliminated_ids))))
+        return move_history
+
+class SolutionCache():
+    # Solved layouts keyed by a hash of the color grid in canonical form:
+    # colors are renumbered in reading order and the smallest of the 8
+    # rotations and reflections is kept, so recolored or mirrored copies
+    # of a puzzle share an entry. Queens are stored as canonical positions
+    # and the least recently used entries are evicted past max_entries.
+    # With autosave the file is rewritten every save_every new entries and
+    # on close, rather than on every put.
+    def __init__(self, path = None, max_entries = 4096, autosave = True, save_every = 32):
+        self.path = Path(path) if path is not None else None
+        self.max_entries = max_entries
+        self.autosave = autosave
+        self.save_every = save_every
+        self.unsaved = 0
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if self.path is not None and self.path.is_file():
+            with open(self.path, 'r') as file:
+                data = json.load(file)
+            if data.get('version') == 1:
+                for key, positions in data['entries'][-max_entries:]:
+                    self.entries[key] = [tuple(position) for position in positions]
+
+    @staticmethod
+    def default_path():
+        return Path(__file__).parent / 'Saved Games' / 'Queens_Solutions.json'
+
+    @staticmethod
+    def symmetries(board_size):
+        last = board_size - 1
+        return [
+            lambda row, column: (row, column),
+            lambda row, column: (column, last - row),
+            lambda row, column: (last - row, last - column),
+            lambda row, column: (last - column, row),
+            lambda row, column: (row, last - column),
+            lambda row, column: (last - row, column),
+            lambda row, column: (column, row),
+            lambda row, column: (last - column, last - row)
+        ]
+
+    @staticmethod
+    def canonical_form(cells):
+        # Returns the fingerprint and each cell keyed by its position in
+        # the canonical grid.
+        cells = list(cells)
+        board_size = int(len(cells) ** 0.5)
+        first_row = min(cell.row for cell in cells)
+        first_column = min(cell.column for cell in cells)
+        best = None
+        for transform in SolutionCache.symmetries(board_size):
+            cell_by_position = {transform(cell.row - first_row, cell.column - first_column): cell for cell in cells}
+            labels = {}
+            layout = bytearray([board_size])
+            for position in sorted(cell_by_position):
+                color = cell_by_position[position].color
+                if color not in labels:
+                    labels[color] = len(labels)
+                layout.append(labels[color])
+            if best is None or layout < best[0]:
+                best = (layout, cell_by_position)
+        return hashlib.sha256(bytes(best[0])).hexdigest(), best[1]
+
+    def get(self, cells):
+        key, cell_by_position = self.canonical_form(cells)
+        positions = self.entries.get(key)
+        if positions is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return [cell_by_position[position] for position in positions if position in cell_by_position]
+
+    def put(self, cells, selected):
+        key, cell_by_position = self.canonical_form(cells)
+        position_by_id = {cell.id: position for position, cell in cell_by_position.items()}
+        self.entries[key] = sorted(position_by_id[cell.id] for cell in selected)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        self.unsaved += 1
+        if self.autosave and self.unsaved >= self.save_every:
+            self.save()
+
+    def save(self):
+        self.unsaved = 0
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = self.path.with_name(self.path.name + '.tmp')
+        with open(temporary_path, 'w') as file:
+            json.dump({'version': 1, 'entries': [[key, positions] for key, positions in self.entries.items()]}, file)
+        os.replace(temporary_path, self.path)
+
+    def close(self):
+        if self.autosave and self.unsaved:
+            self.save()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.entries)
+
+class SearchInterrupted(Exception):
+    # Raised when a search stops early. Iterative searches attach a
+    # checkpoint that Solver.resume continues from.
+    checkpoint = None
+
+class SearchBudgetExceeded(SearchInterrupted):
+    pass
+
+class SearchCancelled(SearchInterrupted):
+    pass
+
+class SolverStats():
+    # Search counters and the time in seconds spent in each board phase,
+    # keyed by method name.
+    def __init__(self):
+        self.nodes = 0
+        self.backtracks = 0
+        self.max_depth = 0
+        self.row_prunes = 0
+        self.column_prunes = 0
+        self.pruned_cells = 0
+        self.propagation_steps = 0
+        self.propagation_selections = 0
+        self.propagation_eliminations = 0
+        self.solutions = 0
+        self.cache_hits = 0
+        self.timings = defaultdict(float)
+
+    @property
+    def prunes(self):
+        return self.row_prunes + self.column_prunes
+
+    def as_dict(self):
+        stats = {name: value for name, value in vars(self).items() if name != 'timings'}
+        stats['prunes'] = self.prunes
+        stats.update({f'{name}_time': value for name, value in self.timings.items()})
+        return stats
+
+    def __str__(self):
+        lines = [f'{name:<26}{value:>12}' for name, value in vars(self).items() if name != 'timings']
+        lines += [f'{name + " (ms)":<26}{value * 1000:>12.2f}' for name, value in sorted(self.timings.items(), key=lambda item: -item[1])]
+        return '\n'.join(lines)
 
 class Solver():
-    def __init__(self, date = None):
-        self.move_history = []
+    def __init__(self, date = None, propagate = True, history_limit = None, history_stream = None, cache = None, node_budget = None, time_budget = None, cancel_event = None, progress_every = 1000):
+        self.move_history = MoveHistory(limit=history_limit, stream=history_stream)
         self.solution_board = None
         self.date = date
+        self.propagate = propagate
+        self.cache = cache
+        # A search that would expand more than node_budget nodes or runs
+        # longer than time_budget seconds raises SearchBudgetExceeded, and
+        # one whose cancel_event is set (e.g. by cancel() from another
+        # thread) raises SearchCancelled. Budgets count from the start of
+        # each solve or resume call. The solver's own event is cleared when
+        # a search starts, so cancel() stops the search that is running and
+        # a resume after it carries on; an event passed in belongs to the
+        # caller and is left alone.
+        self.node_budget = node_budget
+        self.time_budget = time_budget
+        self.owns_cancel_event = cancel_event is None
+        self.cancel_event = cancel_event if cancel_event is not None else threading.Event()
+        self.deadline = None
+        self.budget_start = 0
+        self.search_start = None
+        self.progress_every = progress_every
+        self.checkpoint = None
+        # Subtrees handed to the process pool by parallel searches.
+        self.pool_tasks = 0
+        self.stats = SolverStats()
+        self.hooks = defaultdict(list)
+        self.depth = 0
         self.move_status = [
             'Solution Found!',
             'Searching...',
             'Terminal Node Found, Backtracking...',
             'Trimming Partition...',
-            'Overloaded Partition, Backtracking...'
+            'Overloaded Partition, Backtracking...',
+            'Propagating Constraints...'
         ]
-        
-    def backtrack(self, board, history = False):
-        e_colors = set([cell.color for cell in board.eliminated])
-        s_colors = set([cell.color for cell in board.selected])
-        a_colors = set([cell.color for cell in board.available])
-        if len(e_colors.difference(s_colors, a_colors)) > 0:
-            if history:
-                self.move_history.append({
-                    'selected': board.selected, 
-                    'eliminated': board.eliminated, 
-                    'status': 2
-                    })
-            return board, False
+
+    @property
+    def node_count(self):
+        return self.stats.nodes
+
+    @property
+    def prune_count(self):
+        return self.stats.prunes
+
+    @property
+    def backtrack_count(self):
+        return self.stats.backtracks
+
+    def add_hook(self, event, callback):
+        # Events are 'node', 'prune', 'propagate', 'backtrack', 'solution'
+        # and, every progress_every nodes of an iterative search,
+        # 'progress'. Callbacks get the board and keyword details.
+        self.hooks[event].append(callback)
+
+    def emit(self, event, board, **details):
+        for callback in self.hooks.get(event, ()):
+            callback(board, **details)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @contextmanager
+    def searching(self):
+        # Budgets and the progress clock run from the outermost entry point,
+        # so a search that calls another shares its budget, and are cleared
+        # afterwards so a later search starts with its own.
+        if self.search_start is not None:
+            yield
+            return
+        if self.owns_cancel_event:
+            self.cancel_event.clear()
+        self.search_start = time.perf_counter()
+        self.budget_start = self.stats.nodes
+        self.deadline = self.search_start + self.time_budget if self.time_budget is not None else None
+        try:
+            yield
+        finally:
+            self.search_start = None
+            self.deadline = None
+            self.depth = 0
+            self.move_history.close()
+
+    def check_budget(self, nodes = 0):
+        # Called before each node is expanded, with any nodes expanded
+        # outside stats (DLX) passed in.
+        if self.cancel_event.is_set():
+            raise SearchCancelled('Search was cancelled')
+        if self.node_budget is not None and self.stats.nodes + nodes - self.budget_start >= self.node_budget:
+            raise SearchBudgetExceeded(f'Search exceeded the budget of {self.node_budget} nodes')
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SearchBudgetExceeded(f'Search exceeded the budget of {self.time_budget}s')
+
+    def timed(self, name, function, *args, **kwargs):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        self.stats.timings[name] += time.perf_counter() - start
+        return result
+
+    def record_move(self, board, status, partition = None):
+        self.move_history.record(board, status, partition)
+
+    def found_solution(self, board, history, in_place):
+        self.stats.solutions += 1
+        if history:
+            self.record_move(board, 0)
+        if in_place:
+            board = board.copy()
+        self.solution_board = board
+        self.emit('solution', board, depth=self.depth)
+        return board, True
+
+    def dead_end(self, board, history, status, reason):
+        self.stats.backtracks += 1
+        if history:
+            self.record_move(board, status)
+        self.emit('backtrack', board, depth=self.depth, reason=reason)
+        return board, False
+
+    def expand(self, board, history = False, in_place = False):
+        # One node of the search: the terminal checks, partition trimming
+        # and propagation. Returns the board, whether it is solved, and the
+        # children to try, which are None at a leaf.
+        if board.has_exhausted_color():
+            return self.dead_end(board, history, 2, 'exhausted color') + (None,)
         
         if len(board.selected) == len(board.colors):
-            if history:
-                self.move_history.append({
-                    'selected': board.selected, 
-                    'eliminated': board.eliminated, 
-                    'status': 0
-                    })
-            return board, True
+            return self.found_solution(board, history, in_place) + (None,)
         
+        self.check_budget()
+        self.stats.nodes += 1
+        self.stats.max_depth = max(self.stats.max_depth, self.depth)
+        self.emit('node', board, depth=self.depth)
         if history:
-            self.move_history.append({
-                'selected': board.selected.copy(), 
-                'eliminated': board.eliminated.copy(), 
-                'status': 1
-                })
-        
-        cleaned_partitions, solution_infeasible = board.evaluate_partitions()
+            self.record_move(board, 1)
 
-        if history:
+        while True:
+            cleaned_partitions, solution_infeasible = self.timed('evaluate_partitions', board.evaluate_partitions, fixpoint=True)
             for partition in cleaned_partitions:
-                self.move_history.append({
-                    'selected': board.selected, 
-                    'eliminated': partition['cleaned_cells'], 
-                    'status': 3, 
-                    'partition_data': partition
-                    })
-
-        if solution_infeasible:
+                if partition['kind'] == 'row':
+                    self.stats.row_prunes += 1
+                else:
+                    self.stats.column_prunes += 1
+                self.stats.pruned_cells += len(partition['cleaned_cells'])
+                self.emit('prune', board, depth=self.depth, partition=partition)
+
             if history:
-                self.move_history.append({
-                    'selected': board.selected, 
-                    'eliminated': board.eliminated,
-                    'status': 4
-                    })
-            return board, False
+                for partition in cleaned_partitions:
+                    self.record_move(board, 3, partition)
+
+            if solution_infeasible:
+                return self.dead_end(board, history, 4, 'overloaded partition') + (None,)
+
+            if not self.propagate:
+                break
+
+            propagated = False
+            while True:
+                step, contradiction = self.timed('propagate_step', board.propagate_step)
+                if contradiction:
+                    return self.dead_end(board, history, 2, 'contradiction') + (None,)
+                if step is None:
+                    break
+                propagated = True
+                self.stats.propagation_steps += 1
+                self.stats.propagation_selections += len(step['selected'])
+                self.stats.propagation_eliminations += len(step['eliminated'])
+                self.emit('propagate', board, depth=self.depth, step=step)
+                if history:
+                    self.record_move(board, 5)
+
+            if not propagated:
+                break
+            if len(board.selected) == len(board.colors):
+                return self.found_solution(board, history, in_place) + (None,)
 
-        priority_queue = board.get_priority_queue()
+        priority_queue = self.timed('get_priority_queue', board.get_priority_queue)
+        return board, False, priority_queue
 
-        for selected_cell, _ in priority_queue:
-            new_board, solution = self.backtrack(board.forecast_state(selected_cell), history=history)
-            if solution:
-                self.solution_board = new_board
-                return new_board, True
+    def backtrack(self, board, history = False, in_place = False):
+        with self.searching():
+            return self.descend(board, history, in_place)
+
+    def descend(self, board, history = False, in_place = False):
+        new_board, solution, priority_queue = self.expand(board, history, in_place)
+        if priority_queue is None:
+            return new_board, solution
+
+        self.depth += 1
+        try:
+            for selected_cell, _ in priority_queue:
+                if in_place:
+                    mark = len(board.trail)
+                    self.timed('forecast_state', board.select, selected_cell)
+                    new_board, solution = self.descend(board, history, True)
+                else:
+                    new_board, solution = self.descend(self.timed('forecast_state', board.forecast_state, selected_cell), history)
+                if solution:
+                    return new_board, True
+                if in_place:
+                    board.rollback(mark)
+        finally:
+            self.depth -= 1
         return new_board, False
+
+    def iterate(self, board, history = False, frames = None, count = False):
+        # The in-place backtrack with an explicit stack, so the search is
+        # not bounded by the recursion limit and can stop between any two
+        # nodes. A frame is [children, next child, trail mark, state], where
+        # state is the board to rebuild for frames restored by resume. When
+        # counting, the search goes on past each solution and the total is
+        # stats.solutions.
+        with self.searching():
+            stack = frames if frames is not None else []
+            next_report = self.stats.nodes + self.progress_every
+            entering = True
+            while True:
+                if entering:
+                    self.depth = len(stack)
+                    try:
+                        new_board, solution, priority_queue = self.expand(board, history, True)
+                    except SearchInterrupted as error:
+                        self.checkpoint = error.checkpoint = self.make_checkpoint(board, stack)
+                        self.depth = 0
+                        raise
+                    if solution and not count:
+                        self.depth = 0
+                        return new_board, True
+                    if priority_queue is not None:
+                        stack.append([[cell for cell, _ in priority_queue], 0, len(board.trail), None])
+                    if self.stats.nodes >= next_report:
+                        next_report = self.stats.nodes + self.progress_every
+                        self.report_progress(board, stack)
+
+                if not stack:
+                    self.depth = 0
+                    return board, False
+                frame = stack[-1]
+                cells, index, mark, state = frame
+                if mark is None:
+                    board = type(board)(state)
+                    frame[2] = len(board.trail)
+                    frame[3] = None
+                else:
+                    board.rollback(mark)
+                if index == len(cells):
+                    stack.pop()
+                    entering = False
+                    continue
+                frame[1] += 1
+                self.timed('forecast_state', board.select, cells[index])
+                entering = True
+
+    def report_progress(self, board, stack):
+        # The explored share of the tree, counting each child of a frame as
+        # an equal part of it.
+        explored = 0.0
+        weight = 1.0
+        for cells, index, _, _ in stack:
+            if len(cells) == 0:
+                break
+            explored += weight * max(index - 1, 0) / len(cells)
+            weight /= len(cells)
+        self.emit('progress', board, depth=len(stack), nodes=self.stats.nodes, elapsed=time.perf_counter() - self.search_start, explored=explored)
+
+    @staticmethod
+    def state_ids(available, selected, eliminated):
+        return {'available': sorted(cell.id for cell in available), 'selected': sorted(cell.id for cell in selected), 'eliminated': sorted(cell.id for cell in eliminated)}
+
+    @staticmethod
+    def state_cells(state, cell_by_id):
+        return {name: set(cell_by_id[id] for id in state[name]) for name in ('available', 'selected', 'eliminated')}
+
+    def make_checkpoint(self, board, stack):
+        # Plain ids and counters, so the checkpoint can be stored as JSON.
+        # Rolling back through the frames leaves the board at the root.
+        current = self.state_ids(board.available, board.selected, board.eliminated)
+        frames = []
+        for cells, index, mark, state in reversed(stack):
+            if mark is None:
+                frame_state = self.state_ids(state['available'], state['selected'], state['eliminated'])
+            else:
+                board.rollback(mark)
+                frame_state = self.state_ids(board.available, board.selected, board.eliminated)
+            frames.append({'children': [cell.id for cell in cells], 'next': index, 'state': frame_state})
+        frames.reverse()
+        stats = {name: value for name, value in vars(self.stats).items() if name != 'timings'}
+        return {'version': 1, 'board': current, 'frames': frames, 'stats': stats}
+
+    def resume(self, board, checkpoint = None, history = False, count = False):
+        # Continues an interrupted iterative search. The board only has to
+        # be the same puzzle, it supplies the cells and the board type.
+        checkpoint = checkpoint or self.checkpoint
+        if checkpoint is None or checkpoint.get('version') != 1:
+            raise ValueError('No checkpoint to resume from')
+        cell_by_id = {cell.id: cell for cell in board.cells}
+        for name, value in checkpoint['stats'].items():
+            setattr(self.stats, name, value)
+        frames = [[[cell_by_id[id] for id in frame['children']], frame['next'], None, self.state_cells(frame['state'], cell_by_id)] for frame in checkpoint['frames']]
+        self.checkpoint = None
+        solved_board, solution = self.iterate(type(board)(self.state_cells(checkpoint['board'], cell_by_id)), history, frames, count)
+        if solution and self.cache is not None:
+            self.cache.put(solved_board.cells, solved_board.selected)
+        return solved_board, solution
     
-    def draw_solution(self, scale = 3, margin = 0.5, interval = 50, save = False):
+    def solve(self, board, history = False, method = 'backtrack'):
+        # Only fresh boards go through the cache. A cached board has no
+        # search to animate, so its history replays the cached queens.
+        cacheable = self.cache is not None and len(board.available) == len(board.cells)
+        if cacheable:
+            solution_board = self.cached_solution(board)
+            if solution_board is not None:
+                if history:
+                    self.replay_solution(board, solution_board)
+                return solution_board, True
+        solved_board, solution = self.search(board, history, method)
+        if cacheable and solution:
+            self.cache.put(solved_board.cells, solved_board.selected)
+        return solved_board, solution
+
+    def cached_solution(self, board):
+        cells = self.cache.get(board.cells)
+        if cells is None:
+            return None
+        # A stale or damaged entry is ignored and overwritten by the search.
+        solution_board = board.copy()
+        for cell in cells:
+            if cell not in solution_board.available:
+                return None
+            solution_board.select(cell)
+        if len(solution_board.selected) != len(solution_board.colors):
+            return None
+        self.stats.cache_hits += 1
+        self.solution_board = solution_board
+        self.emit('solution', solution_board, depth=self.depth)
+        return solution_board
+
+    def replay_solution(self, board, solution_board):
+        # Places the queens of a known solution one row at a time.
+        with self.searching():
+            replay_board = board.copy()
+            self.record_move(replay_board, 1)
+            queens = sorted(solution_board.selected, key=lambda cell: cell.row)
+            for number, cell in enumerate(queens):
+                if cell not in replay_board.selected:
+                    replay_board.select(cell)
+                self.record_move(replay_board, 0 if number == len(queens) - 1 else 1)
+
+    def search(self, board, history = False, method = 'backtrack'):
+        with self.searching():
+            return self.dispatch(board, history, method)
+
+    def dispatch(self, board, history, method):
+        if method == 'backtrack':
+            return self.backtrack(board, history=history)
+        if method == 'in_place':
+            return self.backtrack(board, history=history, in_place=True)
+        if method == 'iterative':
+            return self.iterate(board, history=history)
+        if method == 'parallel':
+            if history:
+                raise ValueError('Parallel searches do not record a history')
+            return self.parallel_search(board)
+        if method != 'dlx':
+            raise ValueError(f'Unknown solve method: {method}')
+
+        links = DancingLinks(board.cells, board.available, board.selected)
+        links.on_node = self.check_budget
+        try:
+            solution = links.solve()
+        finally:
+            self.stats.nodes += links.nodes
+        if solution is None:
+            return board, False
+        solution_board = board.copy()
+        for cell in solution:
+            if cell not in board.selected:
+                solution_board.select(cell)
+        if history:
+            self.record_move(solution_board, 0)
+        self.solution_board = solution_board
+        return solution_board, True
+
+    def count_solutions(self, board, limit = None, workers = None):
+        if workers is None:
+            return DancingLinks(board.cells, board.available, board.selected).count_solutions(limit)
+        solutions = self.stats.solutions
+        self.parallel_search(board, workers, count=True, limit=limit)
+        solutions = self.stats.solutions - solutions
+        return solutions if limit is None else min(solutions, limit)
+
+    def merge_stats(self, stats, timings):
+        for name, value in stats.items():
+            if name == 'max_depth':
+                self.stats.max_depth = max(self.stats.max_depth, value)
+            else:
+                setattr(self.stats, name, getattr(self.stats, name) + value)
+        for name, value in timings.items():
+            self.stats.timings[name] += value
+
+    def parallel_search(self, board, workers = None, count = False, limit = None, tasks_per_worker = 4, split_nodes = 2000):
+        # Expands the top of the tree breadth first until there are
+        # tasks_per_worker subtrees per worker, then searches those in a
+        # process pool. A subtree that takes more than split_nodes nodes is
+        # handed back as the tasks left in its checkpoint, so large
+        # subtrees get spread over workers that would otherwise be idle.
+        # The first solution stops every worker; when counting, the
+        # solutions of all subtrees are added up in stats.solutions.
+        workers = workers or os.cpu_count()
+        with self.searching():
+            return self.search_pool(board, workers, count, limit, tasks_per_worker, split_nodes)
+
+    def split_frontier(self, board, size, count = False, limit = None):
+        # The breadth first top of a parallel search. Returns a solution
+        # found before there are size subtrees (never when counting) and
+        # the subtrees left to search.
+        solutions = self.stats.solutions
+        frontier = deque([board.copy()])
+        while frontier and len(frontier) < size:
+            if limit is not None and self.stats.solutions - solutions >= limit:
+                break
+            node, solution, priority_queue = self.expand(frontier.popleft())
+            if solution and not count:
+                return node, frontier
+            if priority_queue is not None:
+                frontier.extend(node.forecast_state(cell) for cell, _ in priority_queue)
+        return None, frontier
+
+    def search_pool(self, board, workers, count, limit, tasks_per_worker, split_nodes):
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+        solutions = self.stats.solutions
+        solved_board, frontier = self.split_frontier(board, workers * tasks_per_worker, count, limit)
+        if solved_board is not None:
+            return solved_board, True
+        if limit is not None and self.stats.solutions - solutions >= limit:
+            return board, True
+        if not frontier:
+            return board, self.stats.solutions > solutions
+
+        tasks = [(self.state_ids(node.available, node.selected, node.eliminated), None) for node in frontier]
+        self.pool_tasks += len(tasks)
+        cancel_event = multiprocessing.Event()
+        solution_ids = None
+        executor = ProcessPoolExecutor(workers, initializer=init_subtree_worker, initargs=(board.cells, type(board), self.propagate, split_nodes, count, cancel_event))
+        try:
+            pending = set(executor.submit(search_subtree, task) for task in tasks)
+            while pending:
+                done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    self.merge_stats(result['stats'], result['timings'])
+                    if result['solution'] is not None and solution_ids is None:
+                        solution_ids = result['solution']
+                    pending.update(executor.submit(search_subtree, task) for task in result['tasks'])
+                    self.pool_tasks += len(result['tasks'])
+                if solution_ids is not None and not count:
+                    break
+                if limit is not None and self.stats.solutions - solutions >= limit:
+                    break
+                self.check_budget()
+        finally:
+            cancel_event.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        if solution_ids is None or count:
+            return board, self.stats.solutions > solutions
+        cell_by_id = {cell.id: cell for cell in board.cells}
+        solution_board = board.copy()
+        for id in solution_ids:
+            if cell_by_id[id] not in board.selected:
+                solution_board.select(cell_by_id[id])
+        self.solution_board = solution_board
+        self.emit('solution', solution_board, depth=0)
+        return solution_board, True
+
+    def solution_color_map(self):
         color_map = {
             "Lime Yellow": "#e6f388",     
             "Pastel Green": "#b3dfa0",    
@@ -333,162 +1877,121 @@ class Solver():
             "Warm Beige": "#b9b29e",        
             "Bright Cyan": "#62efea"        
         }
-        def draw_board(ax, move_history, move_number):            
-            ax.cla()
-            ax.set_xticks([])
-            ax.set_yticks([])
-            ax.set_xlim(1 - margin, int((len(self.solution_board.cells)) ** 0.5 + 1) * scale + margin)
-            ax.set_ylim((int((len(self.solution_board.cells)) ** 0.5 + 1) * scale + margin), (1 - margin)) 
-            ax.set_aspect('equal')
-
-            for spine in ax.spines.values():
-                spine.set_visible(False)
-
-            alpha = 0.4 if (move_history[move_number]['status'] == 3) else 1
-            for cell in self.solution_board.cells:
-                ax.add_patch(plt.Rectangle((cell.column * scale, cell.row * scale),1 * scale, 1 * scale, facecolor=color_map[cell.color], edgecolor='black',linewidth=3 * scale/4, alpha=alpha))
-
-            for cell in move_history[move_number]['selected']:
-                ax.text((cell.column + 0.5) * scale, (cell.row + 0.5) * scale, '\u265B', fontsize=5 * scale, ha='center', va='center')
-
-            if move_history[move_number]['status'] != 3:
-                for cell in move_history[move_number]['eliminated']:
-                    ax.text((cell.column + 0.5) * scale, (cell.row + 0.5) * scale, '\u00D7', fontsize=2 * scale, ha='center', va='center')
-            else:
-                ax.add_patch(
-                    plt.Rectangle(
-                        (move_history[move_number]['partition_data']['west_edge'] * scale, (move_history[move_number]['partition_data']['south_edge'] + 1) * scale),
-                        (move_history[move_number]['partition_data']['east_edge'] - move_history[move_number]['partition_data']['west_edge'] + 1) * scale,
-                        -(move_history[move_number]['partition_data']['south_edge'] - move_history[move_number]['partition_data']['north_edge'] + 1) * scale,
-                        facecolor='black', edgecolor='none', linewidth=3 * scale/4, alpha = 0.2
-                    )
-                )
-                for cell in move_history[move_number]['eliminated']:
-                    ax.text((cell.column + 0.5) * scale, (cell.row + 0.5) * scale, '\u00D7', fontsize=2 * scale, ha='center', va='center', color='black', fontweight='bold')
-                    ax.add_patch(plt.Rectangle((cell.column * scale, cell.row * scale),1 * scale, 1 * scale, facecolor=color_map[cell.color], edgecolor='black',linewidth=3 * scale/4, alpha=1))
-                ax.add_patch(
-                    plt.Rectangle(
-                        (move_history[move_number]['partition_data']['west_edge'] * scale, (move_history[move_number]['partition_data']['south_edge'] + 1) * scale),
-                        (move_history[move_number]['partition_data']['east_edge'] - move_history[move_number]['partition_data']['west_edge'] + 1) * scale,
-                        -(move_history[move_number]['partition_data']['south_edge'] - move_history[move_number]['partition_data']['north_edge'] + 1) * scale,
-                        facecolor='none', edgecolor='black', linewidth=3 * scale/4, alpha = 0.7
-                    )
-                )
-                previous_move_number = move_number
-                while move_history[previous_move_number]['status'] == 3:
-                    previous_move_number -= 1
-                    for cell in move_history[previous_move_number]['eliminated']:
-                        ax.text((cell.column + 0.5) * scale, (cell.row + 0.5) * scale, '\u00D7', fontsize=2 * scale, ha='center', va='center')
-
-            ax.text(3, (int((len(self.solution_board.cells)) ** 0.5 + 1) * scale + margin), f'Move: {move_number + 1}, Status: {self.move_status[move_history[move_number]["status"]]}', fontsize=2.5*scale, ha='left', va='top')
-
-            # if move_number > 0:
-            #     if move_history[move_number - 1]['status'] in (2,4):
-            #         time.sleep(0.2)
+        return Board.extend_color_map(color_map, self.solution_board.colors)
+
+    def solution_path(self, suffix = '.gif'):
+        date = self.date or pacific_date()
+        file_dir = Path(__file__).parent
+        output_dir = file_dir / "Saved Videos"
+        output_dir.mkdir(exist_ok=True)
+        return output_dir / f'Queens_Solve_{date}{suffix}'
+
+    def export_solution(self, path = None, interval = 50, frame_budget = None, final_hold = 1000, workers = None, video = False):
+        if path is None:
+            path = self.solution_path('.mp4' if video else '.gif')
+        from render import BoardRenderer
+        renderer = BoardRenderer(self.solution_board.cells, self.solution_color_map(), self.move_status)
+        return renderer.export(self.move_history, path, interval, frame_budget, final_hold, workers)
 
+    def draw_solution(self, scale = 3, margin = 0.5, interval = 50, save = False, raster = False):
+        import matplotlib.pyplot as plt
+        import matplotlib.animation as animation
+        from render import BoardRenderer
+        if save and raster:
+            self.export_solution(interval=interval)
+
+        renderer = BoardRenderer(self.solution_board.cells, self.solution_color_map(), self.move_status, scale, margin)
         fig, ax = plt.subplots()
         plt.subplots_adjust(left=0, right=1, top=1, bottom=0.15, hspace=0, wspace=0)
-        draw_board(ax, self.move_history, 0)
+        renderer.setup(ax)
+        renderer.draw(self.move_history[0], 0)
 
         def update(val):
-            if val >= len(self.move_history):
-                val = len(self.move_history) - 1
-            draw_board(ax, self.move_history, val)
-            fig.canvas.draw_idle()
+            renderer.draw(self.move_history[val], val)
 
-        ani = animation.FuncAnimation(fig, update, frames = range(len(self.move_history)*2), interval=interval, repeat = False)
-        pacific_tz = pytz.timezone('America/Los_Angeles')
-        
-        if save:
-            if self.date:
-                date = self.date
-            else:
-                date = datetime.datetime.now(pytz.utc).astimezone(pacific_tz)
-                date = datetime.datetime.strftime(date, '%Y%m%d')
-            file_dir = Path(__file__).parent
-            output_dir = file_dir / "Saved Videos"
-            output_dir.mkdir(exist_ok=True)
-            file_output = output_dir / f'Queens_Solve_{date}.gif'
-            ani.save(file_output, writer="pillow")
+        ani = animation.FuncAnimation(fig, update, frames = range(len(self.move_history)), interval=interval, repeat = False)
+
+        if save and not raster:
+            ani.save(self.solution_path(), writer="pillow")
         
         plt.show()
 
-class Scraper():
-    def __init__(self, date = None):
-        self.date = date
-        pass
+# Each process of a parallel search keeps the puzzle and the search
+# settings, so a task is only a board state and a child to select.
+subtree_worker = None
 
-    def get_queens_cells(self, headless = True):
-        if self.date:
-            date = self.date
-        else:
-            pacific_tz = pytz.timezone('America/Los_Angeles')
-            date = datetime.datetime.now(pytz.utc).astimezone(pacific_tz)
-            date = datetime.datetime.strftime(date, '%Y%m%d')
-        
-        file_dir = Path(__file__).parent
-        queens_cells_path = file_dir / f"Saved Games/Queens_Board_{date}.html"
+def init_subtree_worker(cells, board_type, propagate, split_nodes, count, cancel_event):
+    global subtree_worker
+    subtree_worker = {
+        'cell_by_id': {cell.id: cell for cell in cells},
+        'board_type': board_type,
+        'propagate': propagate,
+        'split_nodes': split_nodes,
+        'count': count,
+        'cancel_event': cancel_event
+    }
 
-        print(queens_cells_path)
-        if queens_cells_path.is_file():
-            print('Existing File Found, Reading...')
-            with open(queens_cells_path, 'r') as file:
-                queens_cells_html = BeautifulSoup(file, 'html.parser')
-        else:
-            if self.date:
-                raise Exception(FileNotFoundError)
-            
-            chrome_options = Options()
-            if headless:
-                chrome_options.add_argument("--headless")
-                chrome_options.headless = True
-
-            print('Starting Chrome...')
-            driver = webdriver.Chrome(chrome_options)
-            driver.get('https://www.linkedin.com/games/queens/')
-            
-            print('Loading Page...')
-            iframe = WebDriverWait(driver, 60).until(
-                EC.presence_of_element_located((By.TAG_NAME, "iframe"))
-            )
-            driver.switch_to.frame(iframe)
-            driver.find_element(By.ID, "launch-footer-start-button").click()
-            
-            print('Loading LinkedIn Queens...')
-            queens_cells_html = WebDriverWait(driver, 60).until(
-                EC.presence_of_element_located((By.ID, "queens-grid"))
-            ).get_attribute('innerHTML')
-            
-            print('Retrieved Queens cells...')
-            queens_cells_html = BeautifulSoup(queens_cells_html, 'html.parser')
-            
-            print('Writing File...')
-
-            os.makedirs('Saved Games', exist_ok=True)
-            with open(queens_cells_path, 'w') as file:
-                file.write(str(queens_cells_html))
-            
-            print('Exiting Chrome...')
-            driver.quit()
-        
-        queens_cells = set()
-        id = 0
-        for div in queens_cells_html.find_all('div'):
-            label = div.get('aria-label')
-            if label is None:
-                continue
-            matches = re.match("^.*color (?P<color>[A-Za-z ]+), row (?P<row>[0-9]+), column (?P<column>[0-9]+).*$", label)
-            color = matches['color']
-            row = int(matches['row'])
-            column = int(matches['column'])
-            queens_cells.add(Cell(id, color, row, column, 'available'))
-            id += 1
+def search_subtree(task):
+    state, child = task
+    cell_by_id = subtree_worker['cell_by_id']
+    board = subtree_worker['board_type'](Solver.state_cells(state, cell_by_id))
+    if child is not None:
+        board.select(cell_by_id[child])
+    queens_solver = Solver(propagate=subtree_worker['propagate'], node_budget=subtree_worker['split_nodes'], cancel_event=subtree_worker['cancel_event'])
+    result = {'solution': None, 'tasks': []}
+    try:
+        solved_board, solution = queens_solver.iterate(board, count=subtree_worker['count'])
+        if solution:
+            result['solution'] = [cell.id for cell in solved_board.selected]
+    except SearchBudgetExceeded as error:
+        checkpoint = error.checkpoint
+        result['tasks'].append((checkpoint['board'], None))
+        for frame in checkpoint['frames']:
+            result['tasks'] += [(frame['state'], child) for child in frame['children'][frame['next']:]]
+    except SearchCancelled:
+        pass
+    result['stats'] = {name: value for name, value in vars(queens_solver.stats).items() if name != 'timings'}
+    result['timings'] = dict(queens_solver.stats.timings)
+    return result
 
-        return queens_cells
+# Scraping, rendering and board generation live in scraper.py, render.py
+# and generator.py. Their names are still looked up here for code written
+# against Queens, and each module is only imported on first use.
+moved_names = {
+    'QueensCellParser': 'scraper',
+    'BrowserPool': 'scraper',
+    'Scraper': 'scraper',
+    'BoardArchive': 'scraper',
+    'BoardRenderer': 'render',
+    'Generator': 'generator'
+}
+
+def __getattr__(name):
+    if name not in moved_names:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    import importlib
+    return getattr(importlib.import_module(moved_names[name]), name)
 
 if __name__ == '__main__':
-    queens_scraper = Scraper(date = '20250923')
+    import argparse
+    from scraper import Scraper
+    parser = argparse.ArgumentParser(description='Solve a LinkedIn Queens board and animate the search.')
+    parser.add_argument('--date', default='20250923', help='Board date as YYYYMMDD.')
+    parser.add_argument('--no-animation', action='store_true', help='Print the solution instead of animating it.')
+    args = parser.parse_args()
+
+    queens_scraper = Scraper(date = args.date)
     queens_cells = queens_scraper.get_queens_cells(headless=True)
-    queens_solver = Solver(date = '20250923')
-    solved_board, solution = queens_solver.backtrack(Board({'available': queens_cells, 'selected': set(), 'eliminated': set()}), history=True)
-    queens_solver.draw_solution(interval=175, save=True)
\ No newline at end of file
+    board = Board({'available': queens_cells, 'selected': set(), 'eliminated': set()})
+    # Boards solved before are answered from the cache, and animated as a
+    # replay of the cached queens.
+    with SolutionCache(SolutionCache.default_path()) as cache:
+        queens_solver = Solver(date = args.date, cache = cache)
+        solved_board, solution = queens_solver.solve(board, history=not args.no_animation)
+    if not solution:
+        print('No solution found for this board.')
+    elif args.no_animation:
+        for cell in sorted(solved_board.selected, key=lambda cell: cell.row):
+            print(f'Row {cell.row}, column {cell.column}: {cell.color}')
+    else:
+        queens_solver.draw_solution(interval=175, save=True)
@@ -0,0 +1,167 @@
+import argparse
+import csv
+import datetime
+import glob
+import json
+import multiprocessing
+import os
+import re
+import time
+from functools import partial
+from pathlib import Path
+
+from Queens import Solver, SolutionCache, BOARD_TYPES
+from scraper import Scraper, BoardArchive
+
+# Each worker process opens the archive once and reuses the mapping, and
+# loads the solution cache once. Workers only read the cache; new solutions
+# are stored by the parent so the file has a single writer.
+worker_archive = None
+worker_cache = None
+
+def board_paths(start = None, end = None, pattern = None):
+    if pattern:
+        return sorted(Path(path) for path in glob.glob(pattern))
+
+    start_date = datetime.datetime.strptime(start, '%Y%m%d')
+    end_date = datetime.datetime.strptime(end or start, '%Y%m%d')
+    paths = []
+    while start_date <= end_date:
+        path = Scraper.saved_board_path(start_date.strftime('%Y%m%d'))
+        if path.is_file():
+            paths.append(path)
+        start_date += datetime.timedelta(days=1)
+    return paths
+
+def board_date(path):
+    match = re.search(r'(\d{8})', path.name)
+    return match.group(1) if match else None
+
+def load_board(source, archive_path = None):
+    global worker_archive
+    if archive_path is None:
+        return board_date(source) or source.stem, Scraper.load_queens_cells(source)
+    if worker_archive is None:
+        worker_archive = BoardArchive(archive_path)
+    return source, worker_archive[source]
+
+def load_cache(cache_path):
+    global worker_cache
+    if worker_cache is None:
+        worker_cache = SolutionCache(cache_path, autosave=False)
+    return worker_cache
+
+def solve_board(source, method = 'in_place', board_type = 'bitboard', archive_path = None, render = None, frame_budget = None, cache_path = None):
+    start = time.perf_counter()
+    date, queens_cells = load_board(source, archive_path)
+    parsed = time.perf_counter()
+    queens_solver = Solver(date = date, cache = load_cache(cache_path) if cache_path else None)
+    solved_board, solution = queens_solver.solve(
+        BOARD_TYPES[board_type]({'available': queens_cells, 'selected': set(), 'eliminated': set()}),
+        history=render is not None,
+        method=method
+    )
+    solved = time.perf_counter()
+    result = {
+        'date': date,
+        'path': str(archive_path or source),
+        'solved': solution,
+        'solution': sorted([cell.row, cell.column] for cell in solved_board.selected) if solution else [],
+        'nodes': queens_solver.node_count,
+        'cached': queens_solver.stats.cache_hits > 0,
+        'parse_time': parsed - start,
+        'solve_time': solved - parsed,
+        'wall_time': solved - start
+    }
+    if render is not None:
+        # Boards are already spread across the pool, so each one renders
+        # its frames in its own worker.
+        video = queens_solver.export_solution(frame_budget=frame_budget, workers=1, video=render == 'mp4') if solution else ''
+        result['video'] = str(video)
+        result['render_time'] = time.perf_counter() - solved
+        result['wall_time'] = time.perf_counter() - start
+    return result
+
+def store_solutions(results, cache_path, archive_path = None):
+    cache = SolutionCache(cache_path, autosave=False)
+    for result in results:
+        if not result['solved'] or result['cached']:
+            continue
+        _, queens_cells = load_board(result['date'] if archive_path else Path(result['path']), archive_path)
+        cell_by_position = {(cell.row, cell.column): cell for cell in queens_cells}
+        cache.put(queens_cells, [cell_by_position[tuple(position)] for position in result['solution']])
+    cache.save()
+
+def write_results(results, output):
+    if output.suffix == '.json':
+        with open(output, 'w') as file:
+            json.dump(results, file, indent=2)
+        return
+    with open(output, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=list(results[0].keys()))
+        writer.writeheader()
+        for result in results:
+            record = dict(result)
+            record['solution'] = ' '.join(f'{row}:{column}' for row, column in result['solution'])
+            writer.writerow(record)
+
+def main():
+    parser = argparse.ArgumentParser(description='Solve saved Queens boards in parallel.')
+    parser.add_argument('--start', help='First date to solve (YYYYMMDD).')
+    parser.add_argument('--end', help='Last date to solve (YYYYMMDD), defaults to --start.')
+    parser.add_argument('--glob', help='Glob of saved board files, used instead of a date range.')
+    parser.add_argument('--method', default='in_place', choices=['backtrack', 'in_place', 'iterative', 'dlx'])
+    parser.add_argument('--board', default='bitboard', choices=sorted(BOARD_TYPES))
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--output', default='batch_results.csv', help='Result table, .csv or .json.')
+    parser.add_argument('--archive', help='Read boards from a packed archive instead of the saved HTML.')
+    parser.add_argument('--pack', help='Pack the selected saved boards into an archive file and exit.')
+    parser.add_argument('--render', choices=['gif', 'mp4'], help='Also export each solve animation to Saved Videos.')
+    parser.add_argument('--frame-budget', type=int, help='Sample long searches down to at most this many frames.')
+    parser.add_argument('--cache', nargs='?', const=str(SolutionCache.default_path()), help='Answer previously solved layouts from this solution cache and add new ones to it.')
+    args = parser.parse_args()
+
+    if args.archive:
+        end = args.end or args.start
+        with BoardArchive(args.archive) as archive:
+            sources = [date for date in archive.dates() if (args.start is None or args.start <= date) and (end is None or date <= end)]
+    else:
+        if args.glob is None and args.start is None:
+            args.glob = str(Path(__file__).parent / 'Saved Games' / 'Queens_Board_*.html')
+        sources = board_paths(args.start, args.end, args.glob)
+    if len(sources) == 0:
+        print('No saved boards found.')
+        return
+
+    if args.pack:
+        # Archives are keyed by date, so every board needs its own.
+        boards = {}
+        for path in sources:
+            date = board_date(path)
+            if date is None:
+                parser.error(f'{path} has no YYYYMMDD date in its name to key it by')
+            if date in boards:
+                parser.error(f'{path} has the same date as another board')
+            boards[date] = Scraper.load_queens_cells(path)
+        BoardArchive.pack(boards, args.pack)
+        print(f'Packed {len(sources)} boards into {args.pack}')
+        return
+
+    print(f'Solving {len(sources)} boards with {args.workers} workers...')
+    start = time.perf_counter()
+    worker = partial(solve_board, method=args.method, board_type=args.board, archive_path=args.archive, render=args.render, frame_budget=args.frame_budget, cache_path=args.cache)
+    chunksize = max(1, len(sources) // (args.workers * 4))
+    with multiprocessing.Pool(args.workers) as pool:
+        results = list(pool.imap_unordered(worker, sources, chunksize=chunksize))
+    results.sort(key=lambda result: result['date'])
+    if args.cache:
+        store_solutions(results, args.cache, args.archive)
+
+    write_results(results, Path(args.output))
+    unsolved = [result['date'] for result in results if not result['solved']]
+    print(f'Solved {len(results) - len(unsolved)}/{len(results)} boards in {time.perf_counter() - start:.2f}s, results written to {args.output}')
+    if unsolved:
+        print(f'Unsolved: {", ".join(unsolved)}')
+
+if __name__ == '__main__':
+    main()
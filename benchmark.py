@@ -0,0 +1,227 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+from Queens import Cell, Solver, Board, BitBoard, NumpyBoard, SearchBudgetExceeded
+from generator import Generator
+from scraper import Scraper, BoardArchive
+
+STRATEGIES = {
+    'backtrack': (Board, 'backtrack', True),
+    'backtrack_no_propagation': (Board, 'backtrack', False),
+    'bitboard_in_place': (BitBoard, 'in_place', True),
+    'numpy_in_place': (NumpyBoard, 'in_place', True),
+    'bitboard_iterative': (BitBoard, 'iterative', True),
+    'bitboard_parallel': (BitBoard, 'parallel', True),
+    'dlx': (Board, 'dlx', True),
+}
+
+PUZZLE_SIZES = [6, 8, 10, 16, 20, 30]
+LAYOUT_SIZES = [8, 12, 16, 20]
+HARD_SIZES = [24]
+# Subtrees a parallel search with 4 workers splits the top of the tree into.
+HARD_SPLIT = 16
+SCALING_WORKERS = [1, 2, 4]
+
+def random_layout(board_size, seed, min_backtracks = 1, propagate = False, max_tries = 200, node_budget = 20000, split = None):
+    # Regions grown at random around planted queens, kept only if DLX finds
+    # a solution and the solver has to back out of at least one guess. Most
+    # random layouts are solved straight down from the root. Layouts either
+    # search gets lost in are skipped so one board cannot dominate a run.
+    # With split, layouts a parallel search would solve before filling its
+    # pool with split subtrees are skipped as well.
+    generator = Generator(board_size, seed=seed)
+    for _ in range(max_tries):
+        queens_cells = generator.to_cells(generator.grow_regions(generator.plant_queens()))
+        try:
+            queens_solver = Solver(propagate=propagate, node_budget=node_budget)
+            queens_solver.solve(BitBoard({'available': set(queens_cells), 'selected': set(), 'eliminated': set()}), method='in_place')
+            if queens_solver.stats.backtracks < min_backtracks:
+                continue
+            _, solution = Solver(node_budget=node_budget).solve(Board({'available': set(queens_cells), 'selected': set(), 'eliminated': set()}), method='dlx')
+            if not solution:
+                continue
+        except SearchBudgetExceeded:
+            continue
+        if split is None or Solver().split_frontier(BitBoard({'available': set(queens_cells), 'selected': set(), 'eliminated': set()}), split)[0] is None:
+            return queens_cells
+    raise RuntimeError(f'No {board_size}x{board_size} layout needing {min_backtracks} backtracks in {max_tries} tries')
+
+def hard_layout(board_size, seed):
+    # Layouts that need a hundred backtracks with propagation and that a
+    # parallel search hands to its process pool.
+    return random_layout(board_size, seed, min_backtracks=100, propagate=True, max_tries=400, split=HARD_SPLIT)
+
+def row_layout(board_size):
+    # One color per row, which leaves thousands of solutions, so counting
+    # them all is a fixed amount of work to spread over the pool.
+    return set(Cell(row * board_size + column, f'Row {row + 1}', row + 1, column + 1, 'available') for row in range(board_size) for column in range(board_size))
+
+def load_corpus(saved_glob = None, archive_path = None, sizes = LAYOUT_SIZES, seeds = 3, puzzle_sizes = PUZZLE_SIZES, hard_sizes = HARD_SIZES):
+    corpus = []
+    if archive_path:
+        with BoardArchive(archive_path) as archive:
+            for date in archive.dates():
+                corpus.append((f'saved_{date}', archive[date]))
+    elif saved_glob:
+        for path in sorted(glob.glob(saved_glob)):
+            corpus.append((f'saved_{Path(path).stem.split("_")[-1]}', Scraper.load_queens_cells(path)))
+    for board_size in puzzle_sizes:
+        for seed in range(seeds):
+            corpus.append((f'synthetic_{board_size}x{board_size}_{seed}', Generator(board_size, seed=seed).generate()))
+    for board_size in sizes:
+        for seed in range(seeds):
+            corpus.append((f'layout_{board_size}x{board_size}_{seed}', random_layout(board_size, seed)))
+    for board_size in hard_sizes:
+        for seed in range(seeds):
+            corpus.append((f'hard_{board_size}x{board_size}_{seed}', hard_layout(board_size, seed)))
+    return corpus
+
+def run_strategy(queens_cells, strategy, repeat = 1):
+    board_type, method, propagate = STRATEGIES[strategy]
+    wall_times = []
+    for _ in range(repeat):
+        queens_solver = Solver(propagate=propagate)
+        board = board_type({'available': set(queens_cells), 'selected': set(), 'eliminated': set()})
+        start = time.perf_counter()
+        _, solution = queens_solver.solve(board, method=method)
+        wall_times.append(time.perf_counter() - start)
+    return {
+        'solved': solution,
+        'nodes': queens_solver.node_count,
+        'prunes': queens_solver.prune_count,
+        'backtracks': queens_solver.backtrack_count,
+        'wall_time': min(wall_times),
+        'stats': queens_solver.stats
+    }
+
+def check_corpus(results, min_backtracks):
+    # A corpus solved without a single backtrack only measures the cost of
+    # walking down to the answer, so the generated boards must make the
+    # solvers search.
+    backtracks = sum(result['backtracks'] for key, result in results.items() if key.startswith(('synthetic_', 'layout_', 'hard_')))
+    if backtracks < min_backtracks:
+        return f'The generated boards recorded {backtracks} backtracks, expected at least {min_backtracks}'
+    return None
+
+def measure_scaling(boards, worker_counts, repeat = 1):
+    # Wall time of parallel searches by worker count. Solving stops at the
+    # first solution any worker finds, so its speedup depends on where the
+    # solutions lie; counting covers the whole tree and shows the scaling
+    # of a fixed amount of work.
+    rows = []
+    for name, queens_cells, count in boards:
+        for workers in worker_counts:
+            wall_times = []
+            for _ in range(repeat):
+                queens_solver = Solver()
+                board = BitBoard({'available': set(queens_cells), 'selected': set(), 'eliminated': set()})
+                start = time.perf_counter()
+                queens_solver.parallel_search(board, workers, count=count)
+                wall_times.append(time.perf_counter() - start)
+            rows.append({'board': name, 'mode': 'count' if count else 'solve', 'workers': workers, 'tasks': queens_solver.pool_tasks, 'nodes': queens_solver.stats.nodes, 'wall_time': min(wall_times)})
+    return rows
+
+def compare(results, baseline, tolerance, min_delta):
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        previous = baseline[key]
+        if result['nodes'] > previous['nodes']:
+            regressions.append(f'{key}: nodes {previous["nodes"]} -> {result["nodes"]}')
+        slowdown = result['wall_time'] - previous['wall_time']
+        if slowdown > previous['wall_time'] * tolerance and slowdown > min_delta:
+            regressions.append(f'{key}: wall time {previous["wall_time"]:.4f}s -> {result["wall_time"]:.4f}s')
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Queens solving strategies on saved and synthetic boards.')
+    parser.add_argument('--saved', default=str(Path(__file__).parent / 'Saved Games' / 'Queens_Board_*.html'), help='Glob of saved boards to include.')
+    parser.add_argument('--archive', help='Read saved boards from a packed archive instead.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=LAYOUT_SIZES, help='Sizes of the random layouts that need search.')
+    parser.add_argument('--puzzle-sizes', type=int, nargs='+', default=PUZZLE_SIZES, help='Sizes of the generated boards with a unique solution.')
+    parser.add_argument('--seeds', type=int, default=3, help='Synthetic boards per size.')
+    parser.add_argument('--hard-sizes', type=int, nargs='+', default=HARD_SIZES, help='Sizes of the layouts that a parallel search hands to its pool.')
+    parser.add_argument('--min-backtracks', type=int, default=1, help='Fail if the generated boards record fewer backtracks than this.')
+    parser.add_argument('--scaling-workers', type=int, nargs='+', default=SCALING_WORKERS, help='Worker counts to time parallel searches with.')
+    parser.add_argument('--count-size', type=int, default=8, help='Size of the one color per row board whose solutions are counted in parallel.')
+    parser.add_argument('--no-scaling', action='store_true', help='Skip timing parallel searches by worker count.')
+    parser.add_argument('--strategies', nargs='+', default=list(STRATEGIES), choices=list(STRATEGIES))
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per board, the fastest is reported.')
+    parser.add_argument('--baseline', default=str(Path(__file__).parent / 'benchmark_baseline.json'))
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline.')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed relative wall time slowdown before flagging.')
+    parser.add_argument('--min-delta', type=float, default=0.005, help='Ignore wall time slowdowns smaller than this many seconds.')
+    parser.add_argument('--stats', action='store_true', help='Print the solver counters and phase timings for each run.')
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.saved, args.archive, args.sizes, args.seeds, args.puzzle_sizes, args.hard_sizes)
+    results = {}
+    print(f'{"board":<28}{"strategy":<26}{"nodes":>8}{"prunes":>8}{"backtracks":>12}{"time (ms)":>12}')
+    for name, queens_cells in corpus:
+        for strategy in args.strategies:
+            result = run_strategy(queens_cells, strategy, args.repeat)
+            stats = result.pop('stats')
+            results[f'{name}/{strategy}'] = result
+            print(f'{name:<28}{strategy:<26}{result["nodes"]:>8}{result["prunes"]:>8}{result["backtracks"]:>12}{result["wall_time"] * 1000:>12.2f}')
+            if args.stats:
+                print('\n'.join(f'    {line}' for line in str(stats).splitlines()))
+
+    print()
+    for strategy in args.strategies:
+        strategy_results = [result for key, result in results.items() if key.endswith(f'/{strategy}')]
+        print(f'{strategy:<26} total nodes {sum(result["nodes"] for result in strategy_results):>8}  total time {sum(result["wall_time"] for result in strategy_results) * 1000:>10.2f} ms')
+
+    problem = check_corpus(results, args.min_backtracks)
+    if problem:
+        print(problem)
+        sys.exit(1)
+
+    if not args.no_scaling and (os.cpu_count() or 1) < 2:
+        print()
+        print('Skipping parallel scaling, a single core cannot run workers side by side.')
+    elif not args.no_scaling:
+        boards = [(name, queens_cells, False) for name, queens_cells in corpus if name.startswith('hard_')]
+        boards.append((f'rows_{args.count_size}x{args.count_size}', row_layout(args.count_size), True))
+        rows = measure_scaling(boards, args.scaling_workers, args.repeat)
+        print()
+        print(f'Parallel scaling on {os.cpu_count()} cores:')
+        print(f'{"board":<28}{"mode":<8}{"workers":>8}{"tasks":>8}{"nodes":>10}{"time (ms)":>12}{"speedup":>10}')
+        single = {}
+        for row in rows:
+            single.setdefault(row['board'], row['wall_time'])
+            # Splitting the tree changes the order a solve visits it in, so
+            # a solve row's speedup is mostly that and is marked.
+            marker = '*' if row['mode'] == 'solve' else ' '
+            print(f'{row["board"]:<28}{row["mode"]:<8}{row["workers"]:>8}{row["tasks"]:>8}{row["nodes"]:>10}{row["wall_time"] * 1000:>12.2f}{single[row["board"]] / row["wall_time"]:>9.2f}{marker}')
+        print('* Solves stop at the first solution and the split changes the search order, compare nodes. Count rows cover the whole tree and show the parallel speedup.')
+        idle = sorted(set(row['board'] for row in rows if row['tasks'] == 0))
+        if idle:
+            print(f'Never reached the process pool: {", ".join(idle)}')
+            sys.exit(1)
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        with open(baseline_path, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f'Baseline written to {baseline_path}')
+        return
+
+    if baseline_path.is_file():
+        with open(baseline_path, 'r') as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta)
+        if regressions:
+            print(f'{len(regressions)} regressions against {baseline_path}:')
+            for regression in regressions:
+                print(f'  {regression}')
+            sys.exit(1)
+        print(f'No regressions against {baseline_path}')
+
+if __name__ == '__main__':
+    main()
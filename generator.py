@@ -0,0 +1,205 @@
+import random
+
+from Queens import Board, Cell, DancingLinks, SearchBudgetExceeded, Solver
+
+class Generator():
+    def __init__(self, board_size, seed = None, max_attempts = 20, max_repairs = None, repair_nodes = None, min_backtracks = 0):
+        self.board_size = board_size
+        self.rng = random.Random(seed)
+        self.max_attempts = max_attempts
+        # Boards the search without propagation solves in fewer backtracks
+        # are skipped, which makes large boards much slower to generate.
+        self.min_backtracks = min_backtracks
+        self.max_repairs = max_repairs if max_repairs is not None else 4 * board_size
+        self.repair_nodes = repair_nodes if repair_nodes is not None else 50 * board_size
+
+    def plant_queens(self):
+        columns = []
+        def place(row):
+            if row == self.board_size:
+                return True
+            candidates = list(range(self.board_size))
+            self.rng.shuffle(candidates)
+            for column in candidates:
+                if column in columns or (columns and abs(columns[-1] - column) <= 1):
+                    continue
+                columns.append(column)
+                if place(row + 1):
+                    return True
+                columns.pop()
+            return False
+        place(0)
+        return columns
+
+    def neighbors(self, row, column):
+        return [
+            (row + row_offset, column + column_offset)
+            for row_offset, column_offset in ((1, 0), (-1, 0), (0, 1), (0, -1))
+            if 0 <= row + row_offset < self.board_size and 0 <= column + column_offset < self.board_size
+        ]
+
+    def grow_regions(self, columns):
+        # Every region starts at its planted queen and the regions take turns
+        # claiming a random cell on their border, so each one stays connected
+        # and the planted queens are always a solution.
+        grid = [[None] * self.board_size for _ in range(self.board_size)]
+        for row, column in enumerate(columns):
+            grid[row][column] = row
+        frontier = set(
+            neighbor for row, column in enumerate(columns) for neighbor in self.neighbors(row, column)
+            if grid[neighbor[0]][neighbor[1]] is None
+        )
+        while frontier:
+            row, column = self.rng.choice(sorted(frontier))
+            frontier.discard((row, column))
+            grid[row][column] = self.rng.choice([grid[r][c] for r, c in self.neighbors(row, column) if grid[r][c] is not None])
+            frontier.update((r, c) for r, c in self.neighbors(row, column) if grid[r][c] is None)
+        return grid
+
+    def force_regions(self, columns):
+        # Queens are forced in a random order. A cell may join the region of
+        # the k-th queen only if one of the first k - 1 queens attacks it, so
+        # placing the queens in that order leaves each region a single
+        # candidate and the planted solution is the only one. Every region
+        # starts as its queen and the last one as every other cell, which is
+        # connected since no two queens touch and allowed since each cell is
+        # attacked by two queens. Regions then take border cells from larger
+        # neighbors while the order holds.
+        order = list(range(self.board_size))
+        self.rng.shuffle(order)
+        rank = {row: index for index, row in enumerate(order)}
+        first_attacker = [[self.board_size] * self.board_size for _ in range(self.board_size)]
+        for queen_row, queen_column in enumerate(columns):
+            for row in range(self.board_size):
+                for column in range(self.board_size):
+                    if row == queen_row or column == queen_column or (abs(row - queen_row) <= 1 and abs(column - queen_column) <= 1):
+                        first_attacker[row][column] = min(first_attacker[row][column], rank[queen_row])
+
+        grid = [[self.board_size - 1] * self.board_size for _ in range(self.board_size)]
+        for row, column in enumerate(columns):
+            grid[row][column] = rank[row]
+        members = [[] for _ in range(self.board_size)]
+        for row in range(self.board_size):
+            for column in range(self.board_size):
+                members[grid[row][column]].append((row, column))
+        if self.board_size == 1:
+            # A 1x1 board is its own queen and has no border to grow across.
+            return grid
+        queens = set(enumerate(columns))
+        for _ in range(20 * self.board_size ** 2):
+            region = self.rng.randrange(self.board_size)
+            row, column = self.rng.choice(self.neighbors(*self.rng.choice(members[region])))
+            previous = grid[row][column]
+            if (row, column) in queens or region <= first_attacker[row][column] or len(members[previous]) <= len(members[region]) + 1:
+                continue
+            if not self.stays_connected(grid, row, column):
+                continue
+            grid[row][column] = region
+            members[previous].remove((row, column))
+            members[region].append((row, column))
+        return grid
+
+    def stays_connected(self, grid, row, column):
+        # Whether the region of a cell stays connected without it. Most cells
+        # pass the local test: the neighbors in the region are linked by
+        # region cells around it.
+        region = grid[row][column]
+        ring = [
+            0 <= row + row_offset < self.board_size and 0 <= column + column_offset < self.board_size and grid[row + row_offset][column + column_offset] == region
+            for row_offset, column_offset in ((-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1))
+        ]
+        sides = [index for index in (1, 3, 5, 7) if ring[index]]
+        if len(sides) == 0:
+            return False
+        if all(ring):
+            return True
+        run_starts = set()
+        for index in sides:
+            while ring[(index - 1) % 8]:
+                index = (index - 1) % 8
+            run_starts.add(index)
+        if len(run_starts) == 1:
+            return True
+
+        cells = [(r, c) for r in range(self.board_size) for c in range(self.board_size) if grid[r][c] == region and (r, c) != (row, column)]
+        seen = {cells[0]}
+        stack = [cells[0]]
+        while stack:
+            for neighbor in self.neighbors(*stack.pop()):
+                if neighbor not in seen and neighbor != (row, column) and grid[neighbor[0]][neighbor[1]] == region:
+                    seen.add(neighbor)
+                    stack.append(neighbor)
+        return len(seen) == len(cells)
+
+    def regions_connected(self, grid):
+        regions = {}
+        for row in range(self.board_size):
+            for column in range(self.board_size):
+                regions.setdefault(grid[row][column], []).append((row, column))
+        if len(regions) != self.board_size:
+            return False
+        for region, cells in regions.items():
+            seen = {cells[0]}
+            stack = [cells[0]]
+            while stack:
+                for r, c in self.neighbors(*stack.pop()):
+                    if (r, c) not in seen and grid[r][c] == region:
+                        seen.add((r, c))
+                        stack.append((r, c))
+            if len(seen) != len(cells):
+                return False
+        return True
+
+    def check_repair_budget(self, nodes):
+        if nodes >= self.repair_nodes:
+            raise SearchBudgetExceeded(f'Uniqueness check exceeded the budget of {self.repair_nodes} nodes')
+
+    def has_unique_solution(self, grid):
+        links = DancingLinks(self.to_cells(grid))
+        links.on_node = self.check_repair_budget
+        try:
+            return links.count_solutions(2) == 1
+        except SearchBudgetExceeded:
+            return False
+
+    def repair_regions(self, grid, queens):
+        # Boards from force_regions are solved by region singles alone. Up to
+        # max_repairs times, move a random cell into a neighboring region,
+        # keeping every region connected, and undo the move unless DLX still
+        # finds a single solution within repair_nodes nodes.
+        for _ in range(self.max_repairs):
+            row, column = self.rng.randrange(self.board_size), self.rng.randrange(self.board_size)
+            region = grid[row][column]
+            regions = [grid[r][c] for r, c in self.neighbors(row, column) if grid[r][c] != region]
+            if (row, column) in queens or len(regions) == 0 or not self.stays_connected(grid, row, column):
+                continue
+            grid[row][column] = self.rng.choice(regions)
+            if not self.has_unique_solution(grid):
+                grid[row][column] = region
+        return grid
+
+    def to_cells(self, grid):
+        return set(
+            Cell(row * self.board_size + column, f'Color {grid[row][column] + 1}', row + 1, column + 1, 'available')
+            for row in range(self.board_size) for column in range(self.board_size)
+        )
+
+    def generate(self):
+        for _ in range(self.max_attempts):
+            columns = self.plant_queens()
+            if len(columns) < self.board_size:
+                raise ValueError(f'No {self.board_size}x{self.board_size} board has a solution with no two queens touching')
+            grid = self.repair_regions(self.force_regions(columns), set(enumerate(columns)))
+            if not self.regions_connected(grid):
+                continue
+            queens_cells = self.to_cells(grid)
+            board = Board({'available': set(queens_cells), 'selected': set(), 'eliminated': set()})
+            if Solver(propagate=False).count_solutions(board, limit=2) != 1:
+                continue
+            if self.min_backtracks > 0:
+                queens_solver = Solver(propagate=False)
+                queens_solver.solve(Board({'available': set(queens_cells), 'selected': set(), 'eliminated': set()}), method='backtrack')
+                if queens_solver.stats.backtracks < self.min_backtracks:
+                    continue
+            return queens_cells
+        raise RuntimeError(f'Could not generate a uniquely solvable {self.board_size}x{self.board_size} board with connected regions')
@@ -1,8 +1,27 @@
-from queens import Solver, Scraper, Board
+import argparse
+
+from Queens import Solver, Board, SolutionCache
+from scraper import Scraper
 
 if __name__ == '__main__':
-    queens_scraper = Scraper(date = None)
-    queens_grid = queens_scraper.get_queens_grid(headless=False)
-    queens_solver = Solver(date = None)
-    solved_board, solution = queens_solver.solve(Board(queens_grid), history=True)
-    queens_solver.draw_solution(scale = 3, interval=150, save=True)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Solve today's LinkedIn Queens board and animate the search.")
+    parser.add_argument('--date', help='Solve a saved board from this date (YYYYMMDD) instead.')
+    parser.add_argument('--headless', action='store_true', help='Hide the browser window while fetching the board.')
+    parser.add_argument('--no-animation', action='store_true', help='Print the solution instead of animating it.')
+    args = parser.parse_args()
+
+    queens_scraper = Scraper(date = args.date)
+    queens_cells = queens_scraper.get_queens_cells(headless=args.headless)
+    board = Board({'available': queens_cells, 'selected': set(), 'eliminated': set()})
+    # Boards solved before are answered from the cache, and animated as a
+    # replay of the cached queens.
+    with SolutionCache(SolutionCache.default_path()) as cache:
+        queens_solver = Solver(date = args.date, cache = cache)
+        solved_board, solution = queens_solver.solve(board, history=not args.no_animation)
+    if not solution:
+        print('No solution found for this board.')
+    elif args.no_animation:
+        for cell in sorted(solved_board.selected, key=lambda cell: cell.row):
+            print(f'Row {cell.row}, column {cell.column}: {cell.color}')
+    else:
+        queens_solver.draw_solution(scale = 3, interval=150, save=True)
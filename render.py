@@ -0,0 +1,290 @@
+# matplotlib, numpy, PIL, the process pool and the ffmpeg pipe are imported
+# where they are used, so importing the renderer loads nothing heavy.
+import os
+from functools import partial
+from pathlib import Path
+
+class BoardRenderer():
+    # Draws move history frames from artists created once per board. Each
+    # frame only toggles the marks of cells that changed since the frame
+    # before, and when the canvas supports blitting only those cells are
+    # redrawn. Frames that dim the board for a partition redraw in full.
+    def __init__(self, cells, color_map, move_status, scale = 3, margin = 0.5):
+        self.cells = sorted(cells, key=lambda cell: (cell.row, cell.column))
+        self.board_size = int(len(self.cells) ** 0.5)
+        self.color_map = color_map
+        self.move_status = move_status
+        self.scale = scale
+        self.margin = margin
+        self.shown = self.empty_layers()
+        self.background = None
+
+    @staticmethod
+    def empty_layers():
+        return {'dimmed': False, 'queens': set(), 'crosses': set(), 'bold_crosses': set(), 'partition': None, 'label': ''}
+
+    def frame_layers(self, move, move_number):
+        layers = self.empty_layers()
+        layers['queens'] = set(move['selected'])
+        layers['label'] = f'Move: {move_number + 1}, Status: {self.move_status[move["status"]]}'
+        if move['status'] != 3:
+            layers['crosses'] = set(move['eliminated'])
+            return layers
+        partition = move['partition_data']
+        layers['dimmed'] = True
+        layers['bold_crosses'] = set(partition['cleaned_cells'])
+        layers['crosses'] = (move['eliminated'] | move['previously_cleaned']) - layers['bold_crosses']
+        layers['partition'] = (partition['north_edge'], partition['south_edge'], partition['west_edge'], partition['east_edge'])
+        return layers
+
+    def setup(self, ax):
+        import matplotlib.pyplot as plt
+        self.ax = ax
+        self.canvas = ax.figure.canvas
+        self.blit = getattr(self.canvas, 'supports_blit', False)
+        scale = self.scale
+        extent = (self.board_size + 1) * scale + self.margin
+        ax.set_xticks([])
+        ax.set_yticks([])
+        ax.set_xlim(1 - self.margin, extent)
+        ax.set_ylim(extent, 1 - self.margin)
+        ax.set_aspect('equal')
+        for spine in ax.spines.values():
+            spine.set_visible(False)
+
+        # Marks are animated so a full draw leaves them out of the cached
+        # background, on_draw puts them back.
+        self.cell_artists = {}
+        self.highlight_artists = {}
+        self.queen_artists = {}
+        self.cross_artists = {}
+        for cell in self.cells:
+            self.cell_artists[cell] = ax.add_patch(plt.Rectangle((cell.column * scale, cell.row * scale), scale, scale, facecolor=self.color_map[cell.color], edgecolor='black', linewidth=3 * scale/4, zorder=1))
+            self.highlight_artists[cell] = ax.add_patch(plt.Rectangle((cell.column * scale, cell.row * scale), scale, scale, facecolor=self.color_map[cell.color], edgecolor='black', linewidth=3 * scale/4, zorder=1.3, visible=False))
+            self.queen_artists[cell] = ax.text((cell.column + 0.5) * scale, (cell.row + 0.5) * scale, '\u265B', fontsize=5 * scale, ha='center', va='center', visible=False, animated=self.blit)
+            self.cross_artists[cell] = ax.text((cell.column + 0.5) * scale, (cell.row + 0.5) * scale, '\u00D7', fontsize=2 * scale, ha='center', va='center', color='black', visible=False, animated=self.blit)
+        self.shade_artist = ax.add_patch(plt.Rectangle((0, 0), 0, 0, facecolor='black', edgecolor='none', alpha=0.2, zorder=1.2, visible=False))
+        self.outline_artist = ax.add_patch(plt.Rectangle((0, 0), 0, 0, facecolor='none', edgecolor='black', linewidth=3 * scale/4, alpha=0.7, zorder=1.4, visible=False))
+        self.label_artist = ax.text(3, extent, '', fontsize=2.5 * scale, ha='left', va='top', animated=self.blit)
+        if self.blit:
+            self.canvas.mpl_connect('draw_event', self.on_draw)
+
+    def on_draw(self, event):
+        if self.canvas.is_saving():
+            return
+        self.background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        for artist in list(self.queen_artists.values()) + list(self.cross_artists.values()):
+            if artist.get_visible():
+                self.ax.draw_artist(artist)
+        self.draw_label()
+        # Cells can only be redrawn on their own while a queen fits inside
+        # one, otherwise every frame falls back to a full draw.
+        cell_bbox = self.cell_bbox(self.cells[0])
+        self.cells_fit = 5 * self.scale * self.canvas.figure.dpi / 72 < cell_bbox.width - 6
+
+    def draw_label(self):
+        self.ax.draw_artist(self.label_artist)
+        self.label_bbox = self.label_artist.get_window_extent().padded(2)
+
+    def update_artists(self, layers):
+        shown = self.shown
+        changed = set()
+        for cell in shown['queens'] ^ layers['queens']:
+            self.queen_artists[cell].set_visible(cell in layers['queens'])
+            changed.add(cell)
+        crosses = layers['crosses'] | layers['bold_crosses']
+        for cell in (shown['crosses'] | shown['bold_crosses']) ^ crosses:
+            self.cross_artists[cell].set_visible(cell in crosses)
+            changed.add(cell)
+        for cell in shown['bold_crosses'] ^ layers['bold_crosses']:
+            bold = cell in layers['bold_crosses']
+            self.cross_artists[cell].set_fontweight('bold' if bold else 'normal')
+            self.highlight_artists[cell].set_visible(bold)
+            changed.add(cell)
+        if layers['dimmed'] != shown['dimmed']:
+            for patch in self.cell_artists.values():
+                patch.set_alpha(0.4 if layers['dimmed'] else 1)
+        if layers['partition'] != shown['partition']:
+            for artist in (self.shade_artist, self.outline_artist):
+                artist.set_visible(layers['partition'] is not None)
+                if layers['partition'] is not None:
+                    north_edge, south_edge, west_edge, east_edge = layers['partition']
+                    artist.set_bounds(west_edge * self.scale, (south_edge + 1) * self.scale, (east_edge - west_edge + 1) * self.scale, -(south_edge - north_edge + 1) * self.scale)
+        self.label_artist.set_text(layers['label'])
+        redraw = layers['dimmed'] or shown['dimmed']
+        self.shown = layers
+        return changed, redraw
+
+    def cell_bbox(self, cell):
+        from matplotlib.transforms import Bbox
+        (x0, y0), (x1, y1) = self.ax.transData.transform([(cell.column * self.scale, (cell.row + 1) * self.scale), ((cell.column + 1) * self.scale, cell.row * self.scale)])
+        return Bbox.from_extents(int(x0) - 2, int(y0) - 2, int(x1) + 3, int(y1) + 3)
+
+    def draw(self, move, move_number):
+        changed, redraw = self.update_artists(self.frame_layers(move, move_number))
+        if redraw or not self.blit or self.background is None or not self.cells_fit:
+            self.canvas.draw_idle()
+            return
+
+        regions = [self.cell_bbox(cell) for cell in changed] + [self.label_bbox]
+        height = self.canvas.figure.bbox.height
+        for region in regions:
+            # The saved background covers the whole figure and is addressed
+            # from its top left corner.
+            self.canvas.restore_region(self.background, bbox=(region.x0, height - region.y1, region.x1, height - region.y0), xy=(0, 0))
+        for cell in changed:
+            for artist in (self.queen_artists[cell], self.cross_artists[cell]):
+                if artist.get_visible():
+                    self.ax.draw_artist(artist)
+        self.draw_label()
+        for region in regions + [self.label_bbox]:
+            self.canvas.blit(region)
+
+    def raster_frames(self, moves, cell_pixels = 32):
+        # Renders (move_number, move) pairs straight to RGB arrays without
+        # going through matplotlib. Only changed cells are repainted between
+        # frames that are not dimmed.
+        import numpy as np
+        from PIL import Image, ImageColor, ImageDraw
+
+        size = self.board_size * cell_pixels
+        line = max(1, cell_pixels // 16)
+        label_height = 16
+        base = np.full((size + label_height, size, 3), 255, dtype=np.uint8)
+        for cell in self.cells:
+            top, left = (cell.row - 1) * cell_pixels, (cell.column - 1) * cell_pixels
+            base[top:top + cell_pixels, left:left + cell_pixels] = 0
+            base[top + line:top + cell_pixels - line, left + line:left + cell_pixels - line] = ImageColor.getrgb(self.color_map[cell.color])
+        dimmed = (base * 0.4 + 255 * 0.6).astype(np.uint8)
+
+        def glyph(draw_glyph):
+            image = Image.new('L', (cell_pixels, cell_pixels), 0)
+            draw_glyph(ImageDraw.Draw(image), cell_pixels)
+            return (np.asarray(image, dtype=np.float32) / 255)[:, :, None]
+        queen = glyph(lambda draw, c: draw.polygon([(c * 0.2, c * 0.75), (c * 0.15, c * 0.3), (c * 0.35, c * 0.55), (c * 0.5, c * 0.2), (c * 0.65, c * 0.55), (c * 0.85, c * 0.3), (c * 0.8, c * 0.75)], fill=255))
+        cross = glyph(lambda draw, c: [draw.line(points, fill=255, width=max(1, c // 16)) for points in (((c * 0.4, c * 0.4), (c * 0.6, c * 0.6)), ((c * 0.4, c * 0.6), (c * 0.6, c * 0.4)))])
+        bold_cross = glyph(lambda draw, c: [draw.line(points, fill=255, width=max(2, c // 8)) for points in (((c * 0.38, c * 0.38), (c * 0.62, c * 0.62)), ((c * 0.38, c * 0.62), (c * 0.62, c * 0.38)))])
+
+        def paint(frame, cell, layers, source):
+            top, left = (cell.row - 1) * cell_pixels, (cell.column - 1) * cell_pixels
+            tile = source[top:top + cell_pixels, left:left + cell_pixels].astype(np.float32)
+            for mask, cells in ((queen, layers['queens']), (cross, layers['crosses']), (bold_cross, layers['bold_crosses'])):
+                if cell in cells:
+                    tile = tile * (1 - mask)
+            frame[top:top + cell_pixels, left:left + cell_pixels] = tile.astype(np.uint8)
+
+        frame = None
+        shown = self.empty_layers()
+        for move_number, move in moves:
+            layers = self.frame_layers(move, move_number)
+            if layers['dimmed'] or shown['dimmed'] or frame is None:
+                frame = dimmed.copy() if layers['dimmed'] else base.copy()
+                if layers['partition'] is not None:
+                    north_edge, south_edge, west_edge, east_edge = layers['partition']
+                    region = frame[(north_edge - 1) * cell_pixels:south_edge * cell_pixels, (west_edge - 1) * cell_pixels:east_edge * cell_pixels]
+                    region[:] = (region * 0.8).astype(np.uint8)
+                    source = frame.copy()
+                    for cell in layers['bold_crosses']:
+                        top, left = (cell.row - 1) * cell_pixels, (cell.column - 1) * cell_pixels
+                        source[top:top + cell_pixels, left:left + cell_pixels] = base[top:top + cell_pixels, left:left + cell_pixels]
+                else:
+                    source = frame.copy()
+                for cell in layers['queens'] | layers['crosses'] | layers['bold_crosses']:
+                    paint(frame, cell, layers, source)
+                if layers['partition'] is not None:
+                    top, bottom, left, right = (north_edge - 1) * cell_pixels, south_edge * cell_pixels, (west_edge - 1) * cell_pixels, east_edge * cell_pixels
+                    for rows, columns in ((slice(top, top + line), slice(left, right)), (slice(bottom - line, bottom), slice(left, right)), (slice(top, bottom), slice(left, left + line)), (slice(top, bottom), slice(right - line, right))):
+                        frame[rows, columns] = (frame[rows, columns] * 0.3).astype(np.uint8)
+            else:
+                changed = (shown['queens'] ^ layers['queens']) | (shown['crosses'] ^ layers['crosses'])
+                for cell in changed:
+                    paint(frame, cell, layers, base)
+            label = Image.new('RGB', (size, label_height), (255, 255, 255))
+            ImageDraw.Draw(label).text((2, 2), layers['label'], fill=(0, 0, 0))
+            frame[size:] = np.asarray(label)
+            shown = layers
+            yield frame.copy()
+
+    def render_chunk(self, moves, cell_pixels = 32, palette = False):
+        # GIF frames are reduced to a palette here so that the slow part of
+        # encoding runs in the workers too.
+        from PIL import Image
+        frames = []
+        for frame in self.raster_frames(moves, cell_pixels):
+            image = Image.fromarray(frame)
+            frames.append(image.quantize(method=Image.Quantize.FASTOCTREE) if palette else image)
+        return frames
+
+    @staticmethod
+    def sample_moves(move_count, frame_budget = None):
+        # Evenly spaced move numbers, always keeping the first and last move.
+        if frame_budget is None or move_count <= frame_budget:
+            return list(range(move_count))
+        if frame_budget < 2:
+            return [move_count - 1]
+        return sorted(set(round(index * (move_count - 1) / (frame_budget - 1)) for index in range(frame_budget)))
+
+    def export(self, move_history, path, interval = 50, frame_budget = None, final_hold = 1000, workers = None, cell_pixels = 32):
+        # Frames are rendered in chunks across a process pool, consecutive
+        # identical frames are merged into one longer frame and a sampled
+        # move stands in for the moves skipped after it. Writes an MP4 when
+        # asked for and ffmpeg is on the path, otherwise a GIF.
+        import multiprocessing
+        import shutil
+        import subprocess
+        path = Path(path)
+        if path.suffix == '.mp4' and shutil.which('ffmpeg') is None:
+            path = path.with_suffix('.gif')
+            print(f'ffmpeg not found, writing {path} instead')
+
+        move_numbers = self.sample_moves(len(move_history), frame_budget)
+        durations = [(next_number - move_number) * interval for move_number, next_number in zip(move_numbers, move_numbers[1:])]
+        durations.append(interval + final_hold)
+        workers = workers or os.cpu_count()
+        chunk_size = max(16, -(-len(move_numbers) // (workers * 4)))
+        chunks = [move_numbers[start:start + chunk_size] for start in range(0, len(move_numbers), chunk_size)]
+        moves = ([(move_number, move_history[move_number]) for move_number in chunk] for chunk in chunks)
+
+        def merged_frames(rendered):
+            previous, duration = None, 0
+            frames = (frame for chunk in rendered for frame in chunk)
+            for frame, frame_duration in zip(frames, durations):
+                if previous is not None and frame.tobytes() == previous.tobytes() and frame.getpalette() == previous.getpalette():
+                    duration += frame_duration
+                    continue
+                if previous is not None:
+                    yield previous, duration
+                previous, duration = frame, frame_duration
+            if previous is not None:
+                yield previous, duration
+
+        def write(rendered):
+            if path.suffix == '.mp4':
+                height, width = self.board_size * cell_pixels + 16, self.board_size * cell_pixels
+                command = [
+                    'ffmpeg', '-y', '-loglevel', 'error',
+                    '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{width}x{height}', '-r', f'{1000 / interval:g}', '-i', '-',
+                    '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-pix_fmt', 'yuv420p', '-vcodec', 'libx264', str(path)
+                ]
+                with subprocess.Popen(command, stdin=subprocess.PIPE) as ffmpeg:
+                    for frame, duration in merged_frames(rendered):
+                        data = frame.tobytes()
+                        for _ in range(max(1, round(duration / interval))):
+                            ffmpeg.stdin.write(data)
+                    ffmpeg.stdin.close()
+                if ffmpeg.returncode != 0:
+                    raise RuntimeError(f'ffmpeg exited with status {ffmpeg.returncode}')
+                return
+            images, image_durations = [], []
+            for frame, duration in merged_frames(rendered):
+                images.append(frame)
+                image_durations.append(duration)
+            images[0].save(path, save_all=True, append_images=images[1:], duration=image_durations)
+
+        render_chunk = partial(self.render_chunk, cell_pixels=cell_pixels, palette=path.suffix != '.mp4')
+        if workers == 1 or len(chunks) == 1:
+            write(render_chunk(chunk) for chunk in moves)
+        else:
+            with multiprocessing.Pool(workers) as pool:
+                write(pool.imap(render_chunk, moves))
+        return path
@@ -0,0 +1,361 @@
+# Selenium is imported where a browser is started, so reading saved boards
+# and archives only needs the standard library.
+import re
+from html.parser import HTMLParser
+import os
+import time
+import mmap
+import struct
+import threading
+import queue
+from contextlib import contextmanager
+from pathlib import Path
+
+from Queens import Cell, pacific_date
+
+class QueensCellParser(HTMLParser):
+    # Builds a Cell from the aria-label of each grid div as the markup is
+    # fed in, numbering cells in document order.
+    cell_label = re.compile("^.*color (?P<color>[A-Za-z ]+), row (?P<row>[0-9]+), column (?P<column>[0-9]+).*$")
+
+    def __init__(self):
+        super().__init__()
+        self.queens_cells = set()
+
+    def handle_starttag(self, tag, attrs):
+        if tag != 'div':
+            return
+        label = dict(attrs).get('aria-label')
+        if label is None:
+            return
+        matches = self.cell_label.match(label)
+        self.queens_cells.add(Cell(len(self.queens_cells), matches['color'], int(matches['row']), int(matches['column']), 'available'))
+
+class BrowserPool():
+    # Keeps WebDriver sessions alive between fetches. A session that fails
+    # is quit and a fresh one is started the next time one is needed.
+    def __init__(self, size = 1, headless = True, driver_factory = None):
+        self.size = size
+        self.headless = headless
+        self.driver_factory = driver_factory or self.start_chrome
+        self.idle = queue.LifoQueue()
+        self.started = 0
+        self.lock = threading.Lock()
+
+    def start_chrome(self):
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        chrome_options = Options()
+        if self.headless:
+            chrome_options.add_argument("--headless")
+            chrome_options.headless = True
+        print('Starting Chrome...')
+        return webdriver.Chrome(chrome_options)
+
+    def acquire(self, timeout = None):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            start = self.started < self.size
+            if start:
+                self.started += 1
+        if not start:
+            return self.idle.get(timeout=timeout)
+        try:
+            return self.driver_factory()
+        except Exception:
+            with self.lock:
+                self.started -= 1
+            raise
+
+    def release(self, driver):
+        self.idle.put(driver)
+
+    def discard(self, driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        with self.lock:
+            self.started -= 1
+
+    @contextmanager
+    def session(self):
+        driver = self.acquire()
+        try:
+            yield driver
+        except Exception:
+            self.discard(driver)
+            raise
+        self.release(driver)
+
+    def close(self):
+        print('Exiting Chrome...')
+        while True:
+            try:
+                driver = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            self.discard(driver)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class Scraper():
+    queens_url = 'https://www.linkedin.com/games/queens/'
+
+    def __init__(self, date = None, url = None, pool = None, retries = 2, timeout = 60):
+        self.date = date
+        # Local pages, e.g. a saved copy of the game, can be given as a path.
+        if url is not None and '://' not in str(url):
+            url = Path(url).resolve().as_uri()
+        self.url = url or self.queens_url
+        self.pool = pool
+        self.retries = retries
+        self.timeout = timeout
+
+    @contextmanager
+    def browser_pool(self, headless = True):
+        if self.pool is not None:
+            yield self.pool
+            return
+        with BrowserPool(headless=headless) as pool:
+            yield pool
+
+    def wait_for(self, driver, condition, poll = 0.5):
+        # Polls like WebDriverWait, so drivers other than selenium's (e.g.
+        # a fake one in tests) work without selenium installed.
+        deadline = time.monotonic() + self.timeout
+        while True:
+            result = condition(driver)
+            if result:
+                return result
+            if time.monotonic() > deadline:
+                raise TimeoutError(f'Timed out after {self.timeout}s waiting for {self.url}')
+            time.sleep(poll)
+
+    def read_queens_html(self, driver):
+        # Locators are the plain strings selenium's By constants stand for.
+        print('Loading Page...')
+        driver.get(self.url)
+        self.wait_for(driver, lambda driver: driver.find_elements('tag name', 'iframe') or driver.find_elements('id', 'queens-grid'))
+        iframes = driver.find_elements('tag name', 'iframe')
+        if iframes:
+            driver.switch_to.frame(iframes[0])
+        for start_button in driver.find_elements('id', 'launch-footer-start-button'):
+            start_button.click()
+
+        print('Loading LinkedIn Queens...')
+        queens_cells_html = self.wait_for(driver, lambda driver: driver.find_elements('id', 'queens-grid'))[0].get_attribute('innerHTML')
+        driver.switch_to.default_content()
+        print('Retrieved Queens cells...')
+        return queens_cells_html
+
+    @staticmethod
+    def retry_errors():
+        # Timeouts and dropped connections are OSErrors, so a fake driver
+        # can fail the same way a real session does.
+        try:
+            from selenium.common.exceptions import WebDriverException
+        except ImportError:
+            return (OSError,)
+        return (WebDriverException, OSError)
+
+    def fetch_queens_html(self, headless = True):
+        retry_errors = self.retry_errors()
+        with self.browser_pool(headless) as pool:
+            for attempt in range(self.retries + 1):
+                try:
+                    with pool.session() as driver:
+                        return self.read_queens_html(driver)
+                except retry_errors as error:
+                    if attempt == self.retries:
+                        raise
+                    print(f'Browser session failed ({type(error).__name__}), restarting...')
+
+    def fetch_queens_cells(self, headless = True):
+        return self.parse_queens_cells(self.fetch_queens_html(headless))
+
+    def watch_queens_cells(self, interval = 60, polls = None, headless = True):
+        # Polls the page on one long-lived session and yields the board each
+        # time it differs from the last one seen.
+        previous = None
+        with self.browser_pool(headless) as pool:
+            scraper = Scraper(self.date, self.url, pool, self.retries, self.timeout)
+            poll = 0
+            while polls is None or poll < polls:
+                if poll > 0:
+                    time.sleep(interval)
+                queens_cells = scraper.fetch_queens_cells()
+                encoded = self.encode_board(queens_cells)
+                if encoded != previous:
+                    previous = encoded
+                    yield queens_cells
+                poll += 1
+
+    def get_queens_cells(self, headless = True):
+        date = self.date or pacific_date()
+        
+        queens_cells_path = self.saved_board_path(date)
+
+        print(queens_cells_path)
+        if queens_cells_path.is_file():
+            print('Existing File Found, Reading...')
+            return self.load_queens_cells(queens_cells_path)
+        else:
+            if self.date:
+                raise Exception(FileNotFoundError)
+            
+            queens_cells_html = self.fetch_queens_html(headless)
+            
+            print('Writing File...')
+
+            os.makedirs('Saved Games', exist_ok=True)
+            with open(queens_cells_path, 'w') as file:
+                file.write(queens_cells_html)
+        
+        queens_cells = self.parse_queens_cells(queens_cells_html)
+        self.write_board_cache(queens_cells_path.with_suffix('.qcb'), queens_cells)
+        return queens_cells
+
+    @staticmethod
+    def saved_board_path(date):
+        return Path(__file__).parent / f"Saved Games/Queens_Board_{date}.html"
+
+    @staticmethod
+    def load_queens_cells(queens_cells_path, use_cache = True):
+        queens_cells_path = Path(queens_cells_path)
+        cache_path = queens_cells_path.with_suffix('.qcb')
+        if use_cache and cache_path.is_file() and cache_path.stat().st_mtime >= queens_cells_path.stat().st_mtime:
+            with open(cache_path, 'rb') as file:
+                return Scraper.decode_board(file.read())
+
+        with open(queens_cells_path, 'r') as file:
+            queens_cells = Scraper.parse_queens_cells(file)
+        if use_cache:
+            Scraper.write_board_cache(cache_path, queens_cells)
+        return queens_cells
+
+    # Cached boards are a small header, the color names, then one color
+    # index byte per cell in row-major order. Cell ids follow that order,
+    # matching the order the cells appear in the saved HTML.
+    board_header = struct.Struct('<4sBBBBB')
+
+    @staticmethod
+    def encode_board(queens_cells):
+        queens_cells = sorted(queens_cells, key=lambda cell: (cell.row, cell.column))
+        board_size = int(len(queens_cells) ** 0.5)
+        first_row = queens_cells[0].row
+        first_column = min(cell.column for cell in queens_cells)
+        colors = []
+        for cell in queens_cells:
+            if cell.color not in colors:
+                colors.append(cell.color)
+        data = bytearray(Scraper.board_header.pack(b'QNSB', 1, board_size, first_row, first_column, len(colors)))
+        for color in colors:
+            name = color.encode('utf-8')
+            data.append(len(name))
+            data.extend(name)
+        data.extend(colors.index(cell.color) for cell in queens_cells)
+        return bytes(data)
+
+    @staticmethod
+    def decode_board(data, offset = 0):
+        magic, version, board_size, first_row, first_column, color_count = Scraper.board_header.unpack_from(data, offset)
+        if magic != b'QNSB' or version != 1:
+            raise ValueError('Not a cached Queens board')
+        offset += Scraper.board_header.size
+        colors = []
+        for _ in range(color_count):
+            length = data[offset]
+            colors.append(bytes(data[offset + 1:offset + 1 + length]).decode('utf-8'))
+            offset += 1 + length
+        queens_cells = set()
+        for id, color_index in enumerate(data[offset:offset + board_size * board_size]):
+            row, column = divmod(id, board_size)
+            queens_cells.add(Cell(id, colors[color_index], row + first_row, column + first_column, 'available'))
+        return queens_cells
+
+    @staticmethod
+    def write_board_cache(cache_path, queens_cells):
+        with open(cache_path, 'wb') as file:
+            file.write(Scraper.encode_board(queens_cells))
+
+    @staticmethod
+    def parse_queens_cells(queens_cells_html):
+        # Accepts the grid markup as a string or an open file, which is fed
+        # to the parser in chunks.
+        parser = QueensCellParser()
+        if isinstance(queens_cells_html, str):
+            parser.feed(queens_cells_html)
+        else:
+            for chunk in iter(lambda: queens_cells_html.read(1 << 16), ''):
+                parser.feed(chunk)
+        parser.close()
+        return parser.queens_cells
+
+class BoardArchive():
+    # One file holding many cached boards: a header, an index of
+    # (date, offset, length) entries, then the encoded boards back to back.
+    # The file is memory-mapped and boards are decoded only when requested.
+    # Index keys are fixed width, so only YYYYMMDD dates are accepted.
+    archive_header = struct.Struct('<4sBI')
+    index_entry = struct.Struct('<8sII')
+
+    def __init__(self, archive_path):
+        self.archive_path = Path(archive_path)
+        self.file = open(self.archive_path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = self.archive_header.unpack_from(self.data, 0)
+        if magic != b'QNSA' or version != 1:
+            raise ValueError(f'Not a Queens board archive: {archive_path}')
+        self.index = {}
+        offset = self.archive_header.size
+        for _ in range(count):
+            date, board_offset, length = self.index_entry.unpack_from(self.data, offset)
+            self.index[date.decode('ascii')] = (board_offset, length)
+            offset += self.index_entry.size
+
+    @staticmethod
+    def pack(boards, archive_path):
+        for date in boards:
+            if not isinstance(date, str) or not re.fullmatch('[0-9]{8}', date):
+                raise ValueError(f'Archive keys must be dates as YYYYMMDD, got {date!r}')
+        boards = sorted(boards.items())
+        records = [Scraper.encode_board(queens_cells) for _, queens_cells in boards]
+        offset = BoardArchive.archive_header.size + BoardArchive.index_entry.size * len(records)
+        with open(archive_path, 'wb') as file:
+            file.write(BoardArchive.archive_header.pack(b'QNSA', 1, len(records)))
+            for (date, _), record in zip(boards, records):
+                file.write(BoardArchive.index_entry.pack(date.encode('ascii'), offset, len(record)))
+                offset += len(record)
+            for record in records:
+                file.write(record)
+
+    def dates(self):
+        return sorted(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, date):
+        return date in self.index
+
+    def __getitem__(self, date):
+        offset, _ = self.index[date]
+        return Scraper.decode_board(self.data, offset)
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
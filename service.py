@@ -0,0 +1,296 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from Queens import Cell, Solver, SolutionCache, SearchBudgetExceeded, BOARD_TYPES
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+# Board masks grow with the square of the cell count, so a board much
+# larger than this would take a worker down before its budget applies.
+MAX_BOARD_SIZE = 64
+
+# Each worker process keeps the layouts it has solved in memory, so a
+# board that is requested again is answered without a search.
+worker_cache = None
+
+def parse_layout(request, max_size = MAX_BOARD_SIZE):
+    # A board is sent as {"grid": [[color, ...], ...]}, one list of color
+    # names per row.
+    grid = request.get('grid') if isinstance(request, dict) else None
+    if not isinstance(grid, list) or len(grid) == 0:
+        raise ValueError('Expected a "grid" of color names, one list per row')
+    board_size = len(grid)
+    if board_size > max_size:
+        raise ValueError(f'Boards are limited to {max_size}x{max_size}')
+    if any(not isinstance(row, list) or len(row) != board_size for row in grid):
+        raise ValueError(f'The grid must be {board_size}x{board_size}')
+    if any(not isinstance(color, str) for row in grid for color in row):
+        raise ValueError('Colors must be strings')
+    if len(set(color for row in grid for color in row)) != board_size:
+        raise ValueError(f'A {board_size}x{board_size} board needs {board_size} colors')
+    return grid
+
+def budget(request, name, limit):
+    value = request.get(name)
+    if value is None:
+        return limit
+    if not isinstance(value, (int, float)) or isinstance(value, bool) or value <= 0:
+        raise ValueError(f'"{name}" must be a positive number')
+    return value if limit is None else min(value, limit)
+
+def check_deadline(deadline, time_budget):
+    if deadline is not None and time.perf_counter() > deadline:
+        raise SearchBudgetExceeded(f'Search exceeded the budget of {time_budget}s')
+
+def solve_layout(grid, board_type = 'bitboard', method = 'in_place', node_budget = None, time_budget = None):
+    global worker_cache
+    if worker_cache is None:
+        worker_cache = SolutionCache(autosave=False)
+    # The time budget covers building the board as well as the search.
+    start = time.perf_counter()
+    deadline = start + time_budget if time_budget is not None else None
+    board_size = len(grid)
+    queens_solver = Solver(cache=worker_cache, node_budget=node_budget)
+    result = {'status': 'unsolvable', 'solution': []}
+    try:
+        queens_cells = set()
+        for row, colors in enumerate(grid):
+            check_deadline(deadline, time_budget)
+            queens_cells.update(Cell(row * board_size + column, color, row + 1, column + 1, 'available') for column, color in enumerate(colors))
+        board = BOARD_TYPES[board_type]({'available': queens_cells, 'selected': set(), 'eliminated': set()})
+        check_deadline(deadline, time_budget)
+        if deadline is not None:
+            queens_solver.time_budget = deadline - time.perf_counter()
+        solved_board, solution = queens_solver.solve(board, method=method)
+        if solution:
+            result['status'] = 'solved'
+            result['solution'] = sorted([cell.row, cell.column] for cell in solved_board.selected)
+    except SearchBudgetExceeded as error:
+        result['status'] = 'budget_exceeded'
+        result['error'] = str(error)
+    result['stats'] = queens_solver.stats.as_dict()
+    result['solve_time'] = time.perf_counter() - start
+    return result
+
+def solve_batch(jobs, board_type = 'bitboard', method = 'in_place', batch_budget = None):
+    # Jobs in a batch run one after another, so each gets at most what is
+    # left of batch_budget and a slow board cannot hold up the rest of its
+    # batch for longer than that.
+    deadline = time.perf_counter() + batch_budget if batch_budget is not None else None
+    results = []
+    for grid, node_budget, time_budget in jobs:
+        if deadline is not None:
+            remaining = max(deadline - time.perf_counter(), 0)
+            time_budget = remaining if time_budget is None else min(time_budget, remaining)
+        results.append(solve_layout(grid, board_type, method, node_budget, time_budget))
+    return results
+
+class SolveService():
+    # Requests wait in a queue until a batch is full or the batch window
+    # closes, then the whole batch goes to one worker process. At most one
+    # batch per worker is in flight, so under load batches grow instead of
+    # piling up in the executor. Every request gets at most time_budget
+    # seconds of search and every batch at most batch_budget seconds.
+    def __init__(self, workers = None, batch_size = 16, batch_window = 0.005, max_pending = 4096, node_budget = None, time_budget = 2.0, batch_budget = 5.0, board_type = 'bitboard', method = 'in_place', max_body = 1 << 20, max_board_size = MAX_BOARD_SIZE):
+        self.workers = workers or os.cpu_count()
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.max_pending = max_pending
+        self.node_budget = node_budget
+        self.time_budget = time_budget
+        self.batch_budget = batch_budget
+        self.board_type = board_type
+        self.method = method
+        self.max_body = max_body
+        self.max_board_size = max_board_size
+        self.served = 0
+        self.batches = 0
+        self.in_flight = 0
+        self.executor = None
+        self.pending = None
+        self.slots = None
+
+    def start_executor(self):
+        # Workers are forked lazily, and a plain fork would inherit the
+        # client sockets open at that moment, holding those connections
+        # open after the server closes them.
+        context = None
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('forkserver')
+        return ProcessPoolExecutor(self.workers, mp_context=context)
+
+    async def start(self):
+        self.executor = self.start_executor()
+        self.pending = asyncio.Queue(self.max_pending)
+        self.slots = asyncio.Semaphore(self.workers)
+        self.batcher_task = asyncio.create_task(self.batcher())
+
+    async def stop(self):
+        self.batcher_task.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def submit(self, job):
+        if self.pending.full():
+            raise OverflowError('Too many pending requests')
+        future = asyncio.get_running_loop().create_future()
+        self.pending.put_nowait((job, future))
+        return await future
+
+    async def batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.slots.acquire()
+            batch = [await self.pending.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.pending.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            asyncio.create_task(self.run_batch(batch))
+
+    async def run_batch(self, batch):
+        loop = asyncio.get_running_loop()
+        self.in_flight += len(batch)
+        self.batches += 1
+        executor = self.executor
+        try:
+            worker = partial(solve_batch, board_type=self.board_type, method=self.method, batch_budget=self.batch_budget)
+            results = await loop.run_in_executor(executor, worker, [job for job, _ in batch])
+        except Exception as error:
+            # A worker that died breaks the whole pool, so the first batch
+            # to see it replaces the pool for the requests after it.
+            if isinstance(error, BrokenProcessPool) and self.executor is executor:
+                self.executor = self.start_executor()
+                executor.shutdown(wait=False, cancel_futures=True)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+        else:
+            for (_, future), result in zip(batch, results):
+                # The client may have disconnected while it waited.
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self.in_flight -= len(batch)
+            self.served += len(batch)
+            self.slots.release()
+
+    async def route(self, method, path, body):
+        if path == '/health':
+            if method != 'GET':
+                return 405, {'error': 'Use GET'}
+            return 200, {'workers': self.workers, 'pending': self.pending.qsize(), 'in_flight': self.in_flight, 'served': self.served, 'batches': self.batches}
+        if path != '/solve':
+            return 404, {'error': f'No route for {path}'}
+        if method != 'POST':
+            return 405, {'error': 'Use POST'}
+        try:
+            request = json.loads(body)
+            grid = parse_layout(request, self.max_board_size)
+            job = (grid, budget(request, 'node_budget', self.node_budget), budget(request, 'time_budget', self.time_budget))
+        except ValueError as error:
+            return 400, {'error': str(error)}
+        try:
+            return 200, await self.submit(job)
+        except OverflowError as error:
+            return 503, {'error': str(error)}
+        except BrokenProcessPool:
+            return 503, {'error': 'A worker process died, try again'}
+        except Exception as error:
+            return 500, {'error': f'Solve failed: {type(error).__name__}: {error}'}
+
+    async def handle(self, reader, writer):
+        # Minimal HTTP/1.1 with keep-alive: one JSON request body in, one
+        # JSON response out.
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, path, version = lines[0].split(' ', 2)
+                except ValueError:
+                    await self.respond(writer, 400, {'error': 'Malformed request line'}, False)
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if ':' in line:
+                        name, value = line.split(':', 1)
+                        headers[name.strip().lower()] = value.strip()
+                length = headers.get('content-length', '0') or '0'
+                if not (length.isascii() and length.isdigit()):
+                    await self.respond(writer, 400, {'error': 'Content-Length must be a non-negative integer'}, False)
+                    break
+                length = int(length)
+                if length > self.max_body:
+                    await self.respond(writer, 413, {'error': f'Bodies are limited to {self.max_body} bytes'}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                status, payload = await self.route(method, path.split('?', 1)[0], body)
+                await self.respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode('utf-8')
+        head = f'HTTP/1.1 {status} {STATUS_TEXT[status]}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\nConnection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+async def serve(args):
+    service = SolveService(args.workers, args.batch_size, args.batch_window / 1000, args.max_pending, args.node_budget, args.time_budget, args.batch_budget, args.board, args.method, max_board_size=args.max_board_size)
+    await service.start()
+    if args.unix:
+        server = await asyncio.start_unix_server(service.handle, path=args.unix, backlog=args.backlog)
+        print(f'Serving Queens solves on {args.unix} with {service.workers} workers...')
+    else:
+        server = await asyncio.start_server(service.handle, args.host, args.port, backlog=args.backlog)
+        print(f'Serving Queens solves on http://{args.host}:{args.port} with {service.workers} workers...')
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve Queens solves over HTTP, batching concurrent requests onto a process pool.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help='Listen on this Unix socket path instead of TCP.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--backlog', type=int, default=1024, help='Connections the listening socket queues before refusing.')
+    parser.add_argument('--batch-size', type=int, default=16, help='Most requests sent to a worker at once.')
+    parser.add_argument('--batch-window', type=float, default=5, help='Milliseconds to wait for a batch to fill.')
+    parser.add_argument('--max-pending', type=int, default=4096, help='Queued requests beyond this are refused with 503.')
+    parser.add_argument('--node-budget', type=int, help='Most search nodes per request; requests may ask for less.')
+    parser.add_argument('--time-budget', type=float, default=2.0, help='Most seconds of search per request; requests may ask for less.')
+    parser.add_argument('--batch-budget', type=float, default=5.0, help='Most seconds a worker spends on one batch; later requests in a slow batch get what is left.')
+    parser.add_argument('--max-board-size', type=int, default=MAX_BOARD_SIZE, help='Larger boards are refused with 400.')
+    parser.add_argument('--board', default='bitboard', choices=sorted(BOARD_TYPES))
+    parser.add_argument('--method', default='in_place', choices=['backtrack', 'in_place', 'iterative', 'dlx'])
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print('Stopping...')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+import random
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from Queens import BOARD_TYPES, Solver
+from generator import Generator
+
+def scan_partitions(available, board_size):
+    # The full rescan evaluate_partitions did before it kept counts: every
+    # band between the edges at the start of the pass is checked against
+    # the cells available at that moment.
+    available = set(available)
+    lines = {'row': lambda cell: cell.row, 'column': lambda cell: cell.column}
+    edges = {}
+    for kind, line in lines.items():
+        lows, highs = {}, {}
+        for cell in available:
+            lows[cell.color] = min(lows.get(cell.color, board_size), line(cell))
+            highs[cell.color] = max(highs.get(cell.color, 1), line(cell))
+        edges[kind] = sorted(set(lows.values())), sorted(set(highs.values()))
+    cleaned_partitions = []
+    for kind, line in lines.items():
+        low_edges, high_edges = edges[kind]
+        for low_edge in low_edges:
+            for high_edge in high_edges:
+                if high_edge < low_edge:
+                    continue
+                inside = set(cell.color for cell in available if low_edge <= line(cell) <= high_edge)
+                outside = set(cell.color for cell in available if not low_edge <= line(cell) <= high_edge)
+                only_included = inside - outside
+                if len(only_included) > high_edge - low_edge + 1:
+                    cleaned_partitions.append((kind, low_edge, high_edge, []))
+                    return cleaned_partitions, True, available
+                if len(only_included) == high_edge - low_edge + 1:
+                    cleaned_cells = sorted(cell.id for cell in available if low_edge <= line(cell) <= high_edge and cell.color in outside)
+                    available.difference_update(cell for cell in list(available) if cell.id in cleaned_cells)
+                    if cleaned_cells:
+                        cleaned_partitions.append((kind, low_edge, high_edge, cleaned_cells))
+    return cleaned_partitions, False, available
+
+def partition_summary(cleaned_partitions):
+    return [
+        (partition['kind'], *((partition['north_edge'], partition['south_edge']) if partition['kind'] == 'row' else (partition['west_edge'], partition['east_edge'])), [cell.id for cell in partition['cleaned_cells']])
+        for partition in cleaned_partitions
+    ]
+
+def search_states(board_size, seed, count = 6):
+    # Random layouts with a few queens placed, which leave bands to trim.
+    generator = Generator(board_size, seed=seed)
+    rng = random.Random(seed)
+    for _ in range(count):
+        queens_cells = generator.to_cells(generator.grow_regions(generator.plant_queens()))
+        available = set(queens_cells)
+        selected = []
+        for _ in range(rng.randrange(3)):
+            board = BOARD_TYPES['board']({'available': set(queens_cells), 'selected': set(), 'eliminated': set()})
+            for cell in selected:
+                board.select(cell)
+            if len(board.available) == 0:
+                break
+            selected.append(rng.choice(sorted(board.available, key=lambda cell: cell.id)))
+        yield queens_cells, selected
+
+class EvaluatePartitionsTest(unittest.TestCase):
+    def test_single_pass_matches_full_scan(self):
+        for board_size in range(5, 11):
+            for queens_cells, selected in search_states(board_size, board_size):
+                for name, board_type in BOARD_TYPES.items():
+                    with self.subTest(board_size=board_size, board=name):
+                        board = board_type({'available': set(queens_cells), 'selected': set(), 'eliminated': set()})
+                        for cell in selected:
+                            board.select(cell)
+                        expected, expected_overloaded, expected_available = scan_partitions(board.available, board_size)
+                        cleaned_partitions, overloaded = board.evaluate_partitions()
+                        self.assertEqual(partition_summary(cleaned_partitions), expected)
+                        self.assertEqual(overloaded, expected_overloaded)
+                        if not overloaded:
+                            self.assertEqual(set(board.available), expected_available)
+
+    def test_fixpoint_matches_repeated_scans(self):
+        for board_size in range(5, 11):
+            for queens_cells, selected in search_states(board_size, board_size + 100):
+                for name, board_type in BOARD_TYPES.items():
+                    with self.subTest(board_size=board_size, board=name):
+                        board = board_type({'available': set(queens_cells), 'selected': set(), 'eliminated': set()})
+                        for cell in selected:
+                            board.select(cell)
+                        expected, expected_overloaded, available = [], False, set(board.available)
+                        while True:
+                            cleaned_partitions, expected_overloaded, available = scan_partitions(available, board_size)
+                            expected += cleaned_partitions
+                            if expected_overloaded or len(cleaned_partitions) == 0:
+                                break
+                        cleaned_partitions, overloaded = board.evaluate_partitions(fixpoint=True)
+                        self.assertEqual(partition_summary(cleaned_partitions), expected)
+                        self.assertEqual(overloaded, expected_overloaded)
+                        if not overloaded:
+                            self.assertEqual(set(board.available), available)
+
+    def test_fixpoint_keeps_the_dlx_solution(self):
+        for board_size in range(5, 11):
+            queens_cells = Generator(board_size, seed=board_size).generate()
+            dlx_board, _ = Solver().solve(BOARD_TYPES['board']({'available': set(queens_cells), 'selected': set(), 'eliminated': set()}), method='dlx')
+            for name, board_type in BOARD_TYPES.items():
+                with self.subTest(board_size=board_size, board=name):
+                    board = board_type({'available': set(queens_cells), 'selected': set(), 'eliminated': set()})
+                    _, overloaded = board.evaluate_partitions(fixpoint=True)
+                    self.assertFalse(overloaded)
+                    self.assertLessEqual(set(dlx_board.selected), set(board.available))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import sys
+import time
+import unittest
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from Queens import Board, DancingLinks, Solver
+from generator import Generator
+
+class GeneratorTest(unittest.TestCase):
+    def assert_puzzle(self, queens_cells, board_size):
+        self.assertEqual(len(queens_cells), board_size * board_size)
+        self.assertEqual(len(Counter(cell.color for cell in queens_cells)), board_size)
+        self.assertEqual(DancingLinks(queens_cells).count_solutions(), 1)
+
+    def test_small_boards_are_unique_and_connected(self):
+        for board_size in range(5, 11):
+            generator = Generator(board_size, seed=board_size)
+            queens_cells = generator.generate()
+            self.assert_puzzle(queens_cells, board_size)
+            grid = [[None] * board_size for _ in range(board_size)]
+            for cell in queens_cells:
+                grid[cell.row - 1][cell.column - 1] = int(cell.color.split()[-1]) - 1
+            self.assertTrue(generator.regions_connected(grid))
+
+    def test_tiny_boards(self):
+        self.assert_puzzle(Generator(1, seed=0).generate(), 1)
+        self.assert_puzzle(Generator(4, seed=0).generate(), 4)
+        for board_size in (2, 3):
+            with self.subTest(board_size=board_size):
+                with self.assertRaises(ValueError):
+                    Generator(board_size, seed=0).generate()
+
+    def test_large_board_generates_quickly(self):
+        start = time.perf_counter()
+        queens_cells = Generator(30, seed=0).generate()
+        self.assertLess(time.perf_counter() - start, 10)
+        self.assert_puzzle(queens_cells, 30)
+
+    def test_min_backtracks_keeps_boards_that_need_search(self):
+        queens_cells = Generator(8, seed=1, min_backtracks=1).generate()
+        queens_solver = Solver(propagate=False)
+        queens_solver.solve(Board({'available': set(queens_cells), 'selected': set(), 'eliminated': set()}))
+        self.assertGreaterEqual(queens_solver.stats.backtracks, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import Queens
+from Queens import Board, Solver
+from scraper import BoardArchive, BrowserPool, Scraper
+
+FIXTURE = Path(__file__).parent / 'fixtures' / 'queens_board.html'
+SOLUTION = [(1, 2), (2, 4), (3, 6), (4, 1), (5, 3), (6, 5)]
+
+def grid_html(page):
+    # The markup between the grid div and its closing tag, as the browser
+    # returns it for innerHTML.
+    start = page.index('>', page.index('id="queens-grid"')) + 1
+    return page[start:page.rindex('</div>')]
+
+class FakeElement():
+    def __init__(self, html = ''):
+        self.html = html
+        self.clicks = 0
+
+    def get_attribute(self, name):
+        return self.html if name == 'innerHTML' else None
+
+    def click(self):
+        self.clicks += 1
+
+class FakeSwitchTo():
+    def frame(self, frame):
+        pass
+
+    def default_content(self):
+        pass
+
+class FakeDriver():
+    # Answers the few WebDriver calls the scraper makes from static pages.
+    def __init__(self, browser):
+        self.browser = browser
+        self.page = None
+        self.quit_called = False
+        self.switch_to = FakeSwitchTo()
+
+    def get(self, url):
+        self.browser.urls.append(url)
+        load = len(self.browser.urls)
+        if load in self.browser.failing_loads:
+            raise ConnectionResetError(f'Session lost on load {load}')
+        self.page = self.browser.pages[min(load, len(self.browser.pages)) - 1]
+
+    def find_elements(self, by, value):
+        if (by, value) == ('id', 'queens-grid'):
+            return [FakeElement(grid_html(self.page))]
+        if (by, value) == ('id', 'launch-footer-start-button'):
+            return [self.browser.start_button]
+        return []
+
+    def quit(self):
+        self.quit_called = True
+
+class FakeBrowser():
+    # Serves pages[n] on the n-th load, the last page from then on, and
+    # drops the session on the loads in failing_loads.
+    def __init__(self, pages, failing_loads = ()):
+        self.pages = pages
+        self.failing_loads = set(failing_loads)
+        self.urls = []
+        self.drivers = []
+        self.start_button = FakeElement()
+
+    def start(self):
+        driver = FakeDriver(self)
+        self.drivers.append(driver)
+        return driver
+
+def solve(queens_cells):
+    board, solution = Solver().solve(Board({'available': set(queens_cells), 'selected': set(), 'eliminated': set()}))
+    return sorted((cell.row, cell.column) for cell in board.selected) if solution else None
+
+class ScraperTest(unittest.TestCase):
+    def setUp(self):
+        self.page = FIXTURE.read_text()
+
+    def test_fetch_queens_cells(self):
+        browser = FakeBrowser([self.page])
+        with BrowserPool(driver_factory=browser.start) as pool:
+            queens_cells = Scraper(url=FIXTURE, pool=pool, timeout=1).fetch_queens_cells()
+        self.assertEqual(len(queens_cells), 36)
+        self.assertEqual(len(set(cell.color for cell in queens_cells)), 6)
+        self.assertEqual(solve(queens_cells), SOLUTION)
+        self.assertEqual(browser.urls, [FIXTURE.resolve().as_uri()])
+        self.assertEqual(browser.start_button.clicks, 1)
+
+    def test_fetch_retries_failed_session(self):
+        browser = FakeBrowser([self.page], failing_loads=[1])
+        pool = BrowserPool(driver_factory=browser.start)
+        queens_cells = Scraper(url=FIXTURE, pool=pool, timeout=1).fetch_queens_cells()
+        self.assertEqual(solve(queens_cells), SOLUTION)
+        self.assertEqual(len(browser.drivers), 2)
+        self.assertTrue(browser.drivers[0].quit_called)
+        self.assertFalse(browser.drivers[1].quit_called)
+        self.assertEqual(pool.started, 1)
+        pool.close()
+        self.assertTrue(browser.drivers[1].quit_called)
+
+    def test_fetch_gives_up_after_retries(self):
+        browser = FakeBrowser([self.page], failing_loads=[1, 2, 3])
+        with BrowserPool(driver_factory=browser.start) as pool:
+            with self.assertRaises(ConnectionResetError):
+                Scraper(url=FIXTURE, pool=pool, retries=2, timeout=1).fetch_queens_cells()
+        self.assertEqual(len(browser.drivers), 3)
+        self.assertTrue(all(driver.quit_called for driver in browser.drivers))
+
+    def test_watch_queens_cells(self):
+        # The board changes on the third poll and the second poll loses its
+        # session, which is replaced without ending the watch.
+        changed = self.page.replace('Lavender', 'Swap').replace('Bittersweet', 'Lavender').replace('Swap', 'Bittersweet')
+        browser = FakeBrowser([self.page, self.page, self.page, changed], failing_loads=[2])
+        with BrowserPool(driver_factory=browser.start) as pool:
+            boards = list(Scraper(url=FIXTURE, pool=pool, timeout=1).watch_queens_cells(interval=0, polls=3))
+        self.assertEqual(len(boards), 2)
+        self.assertEqual(len(browser.urls), 4)
+        self.assertEqual(len(browser.drivers), 2)
+        self.assertEqual(solve(boards[0]), SOLUTION)
+        self.assertNotEqual(Scraper.encode_board(boards[0]), Scraper.encode_board(boards[1]))
+
+class BoardArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.queens_cells = Scraper.parse_queens_cells(grid_html(FIXTURE.read_text()))
+
+    def test_pack_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            archive_path = Path(directory) / 'boards.qna'
+            BoardArchive.pack({'20250923': self.queens_cells, '20250101': self.queens_cells}, archive_path)
+            with BoardArchive(archive_path) as archive:
+                self.assertEqual(archive.dates(), ['20250101', '20250923'])
+                self.assertEqual(solve(archive['20250923']), SOLUTION)
+
+    def test_pack_rejects_keys_that_are_not_date_strings(self):
+        with tempfile.TemporaryDirectory() as directory:
+            archive_path = Path(directory) / 'boards.qna'
+            for date in (20250923, '2025-09-23', '202509230'):
+                with self.subTest(date=date):
+                    with self.assertRaises(ValueError):
+                        BoardArchive.pack({date: self.queens_cells}, archive_path)
+
+class ModuleSplitTest(unittest.TestCase):
+    def test_queens_reexports_moved_names(self):
+        self.assertIs(Queens.Scraper, Scraper)
+        self.assertIs(Queens.BrowserPool, BrowserPool)
+        self.assertIs(Queens.BoardArchive, BoardArchive)
+        from generator import Generator
+        from render import BoardRenderer
+        self.assertIs(Queens.Generator, Generator)
+        self.assertIs(Queens.BoardRenderer, BoardRenderer)
+        with self.assertRaises(AttributeError):
+            Queens.Missing
+
+    def test_import_leaves_moved_modules_unloaded(self):
+        code = "import sys, Queens; print(' '.join(sorted(set(sys.modules) & {'scraper', 'render', 'generator', 'selenium', 'matplotlib', 'pytz'})))"
+        result = subprocess.run([sys.executable, '-c', code], cwd=Path(__file__).resolve().parent.parent, capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), '')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import asyncio
+import json
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from generator import Generator
+from service import MAX_BOARD_SIZE, SolveService, parse_layout, solve_layout
+
+def generated_grid(board_size, seed = 0):
+    grid = [[None] * board_size for _ in range(board_size)]
+    for cell in Generator(board_size, seed=seed).generate():
+        grid[cell.row - 1][cell.column - 1] = cell.color
+    return grid
+
+class SolveLayoutTest(unittest.TestCase):
+    def test_boards_above_the_size_cap_are_refused(self):
+        board_size = MAX_BOARD_SIZE + 1
+        grid = [[f'Color {row}' for _ in range(board_size)] for row in range(board_size)]
+        with self.assertRaisesRegex(ValueError, 'limited'):
+            parse_layout({'grid': grid})
+
+    def test_time_budget_covers_building_the_board(self):
+        result = solve_layout(generated_grid(8), time_budget=1e-9)
+        self.assertEqual(result['status'], 'budget_exceeded')
+
+    def test_solves_small_layout(self):
+        result = solve_layout(parse_layout({'grid': generated_grid(6)}))
+        self.assertEqual(result['status'], 'solved')
+        self.assertEqual(len(result['solution']), 6)
+
+class BrokenExecutor():
+    # Fails every submission the way a pool with a dead worker does.
+    def submit(self, *args, **kwargs):
+        raise BrokenProcessPool('A child process terminated abruptly')
+
+    def shutdown(self, wait = True, cancel_futures = False):
+        pass
+
+class ThreadedService(SolveService):
+    def start_executor(self):
+        return ThreadPoolExecutor(self.workers)
+
+class SolveServiceTest(unittest.TestCase):
+    def test_broken_pool_is_reported_and_replaced(self):
+        async def run():
+            service = ThreadedService(workers=1)
+            await service.start()
+            service.executor = BrokenExecutor()
+            body = json.dumps({'grid': generated_grid(6)}).encode('utf-8')
+            try:
+                broken = await service.route('POST', '/solve', body)
+                recovered = await service.route('POST', '/solve', body)
+            finally:
+                await service.stop()
+            return broken, recovered
+        (broken_status, _), (status, payload) = asyncio.run(run())
+        self.assertEqual(broken_status, 503)
+        self.assertEqual(status, 200)
+        self.assertEqual(payload['status'], 'solved')
+
+    def test_worker_errors_are_reported(self):
+        async def run():
+            service = ThreadedService(workers=1, board_type='missing')
+            await service.start()
+            try:
+                return await service.route('POST', '/solve', json.dumps({'grid': generated_grid(6)}).encode('utf-8'))
+            finally:
+                await service.stop()
+        status, payload = asyncio.run(run())
+        self.assertEqual(status, 500)
+        self.assertIn('KeyError', payload['error'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+import json
+import sys
+import threading
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from Queens import BOARD_TYPES, Cell, DancingLinks, SearchBudgetExceeded, SearchCancelled, SolutionCache, Solver
+from generator import Generator
+
+BOARD_SIZES = range(5, 11)
+
+def new_board(board_type, queens_cells):
+    return board_type({'available': set(queens_cells), 'selected': set(), 'eliminated': set()})
+
+def row_layout(board_size):
+    # One color per row, which leaves hundreds of solutions to count.
+    return set(Cell(row * board_size + column, f'Row {row + 1}', row + 1, column + 1, 'available') for row in range(board_size) for column in range(board_size))
+
+def counters(queens_solver):
+    return queens_solver.stats.nodes, queens_solver.stats.backtracks, queens_solver.stats.solutions
+
+def history_frames(queens_solver):
+    frames = []
+    for frame in queens_solver.move_history:
+        partition = frame.get('partition_data')
+        if partition is not None:
+            partition = dict(partition, cleaned_cells=[cell.id for cell in partition['cleaned_cells']])
+        frames.append((frozenset(cell.id for cell in frame['selected']), frozenset(cell.id for cell in frame['eliminated']), frame['status'], partition))
+    return frames
+
+class SearchModeTest(unittest.TestCase):
+    # The trail searches (in_place and iterative) must walk the same tree
+    # as the copying backtrack on every board type, and land on the single
+    # solution DLX finds.
+    def test_trail_searches_match_copying_backtrack(self):
+        for board_size in BOARD_SIZES:
+            queens_cells = Generator(board_size, seed=board_size, min_backtracks=1).generate()
+            _, solution = Solver().solve(new_board(BOARD_TYPES['board'], queens_cells), method='dlx')
+            self.assertTrue(solution)
+            for propagate in (True, False):
+                reference = Solver(propagate=propagate)
+                reference_board, _ = reference.solve(new_board(BOARD_TYPES['board'], queens_cells), history=True)
+                expected = history_frames(reference)
+                for name, board_type in BOARD_TYPES.items():
+                    for method in ('backtrack', 'in_place', 'iterative'):
+                        with self.subTest(board_size=board_size, propagate=propagate, board=name, method=method):
+                            queens_solver = Solver(propagate=propagate)
+                            solved_board, solution = queens_solver.solve(new_board(board_type, queens_cells), history=True, method=method)
+                            self.assertTrue(solution)
+                            self.assertEqual(set(solved_board.selected), set(reference_board.selected))
+                            self.assertEqual(set(queens_solver.solution_board.selected), set(reference_board.selected))
+                            self.assertEqual(history_frames(queens_solver), expected)
+                            self.assertEqual(set(queens_solver.stats.timings), set(reference.stats.timings))
+
+    def test_solutions_match_dlx(self):
+        for board_size in BOARD_SIZES:
+            queens_cells = Generator(board_size, seed=board_size).generate()
+            dlx_board, _ = Solver().solve(new_board(BOARD_TYPES['board'], queens_cells), method='dlx')
+            for name, board_type in BOARD_TYPES.items():
+                with self.subTest(board_size=board_size, board=name):
+                    solved_board, solution = Solver().solve(new_board(board_type, queens_cells), method='in_place')
+                    self.assertTrue(solution)
+                    self.assertEqual(set(solved_board.selected), set(dlx_board.selected))
+
+class InterruptedSearchTest(unittest.TestCase):
+    def setUp(self):
+        self.queens_cells = row_layout(7)
+        self.expected_count = DancingLinks(self.queens_cells).count_solutions()
+        reference = Solver()
+        reference.iterate(new_board(BOARD_TYPES['bitboard'], self.queens_cells), count=True)
+        self.expected_counters = counters(reference)
+
+    def resume_until_done(self, queens_solver, checkpoint = None):
+        resumes = 0
+        while True:
+            try:
+                return queens_solver.resume(new_board(BOARD_TYPES['bitboard'], self.queens_cells), checkpoint, count=True), resumes
+            except SearchBudgetExceeded:
+                checkpoint = None
+                resumes += 1
+
+    def test_node_budget_stops_and_resumes(self):
+        queens_solver = Solver(node_budget=100)
+        with self.assertRaises(SearchBudgetExceeded) as raised:
+            queens_solver.iterate(new_board(BOARD_TYPES['bitboard'], self.queens_cells), count=True)
+        self.assertIsNotNone(raised.exception.checkpoint)
+        self.assertEqual(queens_solver.stats.nodes, 100)
+        _, resumes = self.resume_until_done(queens_solver)
+        self.assertGreater(resumes, 5)
+        self.assertEqual(queens_solver.stats.solutions, self.expected_count)
+        self.assertEqual(counters(queens_solver), self.expected_counters)
+
+    def test_time_budget_stops_and_resumes(self):
+        queens_solver = Solver(time_budget=0.001)
+        with self.assertRaises(SearchBudgetExceeded):
+            queens_solver.iterate(new_board(BOARD_TYPES['bitboard'], self.queens_cells), count=True)
+        self.assertLess(queens_solver.stats.nodes, self.expected_counters[0])
+        queens_solver.time_budget = None
+        queens_solver.resume(new_board(BOARD_TYPES['bitboard'], self.queens_cells), count=True)
+        self.assertEqual(counters(queens_solver), self.expected_counters)
+
+    def test_cancel_from_another_thread_then_resume(self):
+        queens_solver = Solver()
+        def cancel_at(board, **details):
+            if queens_solver.stats.nodes == 50:
+                canceller = threading.Thread(target=queens_solver.cancel)
+                canceller.start()
+                canceller.join()
+        queens_solver.add_hook('node', cancel_at)
+        with self.assertRaises(SearchCancelled):
+            queens_solver.iterate(new_board(BOARD_TYPES['bitboard'], self.queens_cells), count=True)
+        self.assertEqual(queens_solver.stats.nodes, 50)
+        queens_solver.resume(new_board(BOARD_TYPES['bitboard'], self.queens_cells), count=True)
+        self.assertEqual(counters(queens_solver), self.expected_counters)
+
+    def test_checkpoint_round_trips_through_json(self):
+        queens_cells = Generator(10, seed=4, min_backtracks=1).generate()
+        reference = Solver(propagate=False)
+        reference_board, _ = reference.iterate(new_board(BOARD_TYPES['bitboard'], queens_cells))
+        self.assertGreater(reference.stats.nodes, 3)
+        queens_solver = Solver(propagate=False, node_budget=3)
+        with self.assertRaises(SearchBudgetExceeded) as raised:
+            queens_solver.iterate(new_board(BOARD_TYPES['bitboard'], queens_cells))
+        checkpoint = json.loads(json.dumps(raised.exception.checkpoint))
+        resumed = Solver(propagate=False)
+        solved_board, solution = resumed.resume(new_board(BOARD_TYPES['bitboard'], queens_cells), checkpoint)
+        self.assertTrue(solution)
+        self.assertEqual(set(solved_board.selected), set(reference_board.selected))
+        self.assertEqual(counters(resumed), counters(reference))
+
+class ParallelSearchTest(unittest.TestCase):
+    # split_nodes is kept tiny so workers hand interrupted subtrees back as
+    # tasks from their checkpoints.
+    def test_count_matches_dlx(self):
+        queens_cells = row_layout(7)
+        expected = DancingLinks(queens_cells).count_solutions()
+        queens_solver = Solver()
+        queens_solver.parallel_search(new_board(BOARD_TYPES['bitboard'], queens_cells), 2, count=True, split_nodes=5)
+        self.assertEqual(queens_solver.stats.solutions, expected)
+        self.assertGreater(queens_solver.pool_tasks, 8)
+        self.assertEqual(Solver().count_solutions(new_board(BOARD_TYPES['bitboard'], queens_cells), workers=2), expected)
+
+    def test_count_stops_at_limit(self):
+        queens_cells = row_layout(7)
+        self.assertEqual(Solver().count_solutions(new_board(BOARD_TYPES['bitboard'], queens_cells), limit=5, workers=2), 5)
+
+    def test_first_solution_stops_the_workers(self):
+        queens_cells = row_layout(7)
+        queens_solver = Solver()
+        solved_board, solution = queens_solver.parallel_search(new_board(BOARD_TYPES['bitboard'], queens_cells), 2, split_nodes=5)
+        self.assertTrue(solution)
+        self.assertGreater(queens_solver.pool_tasks, 0)
+        self.assertLess(queens_solver.stats.solutions, DancingLinks(queens_cells).count_solutions())
+        queens = sorted(solved_board.selected, key=lambda cell: cell.row)
+        self.assertEqual([cell.row for cell in queens], list(range(1, 8)))
+        self.assertEqual(len(set(cell.column for cell in queens)), 7)
+        self.assertTrue(all(abs(above.column - below.column) > 1 for above, below in zip(queens, queens[1:])))
+
+    def test_parallel_solve_matches_dlx(self):
+        for board_size, split_nodes in ((8, 2000), (11, 5)):
+            queens_cells = Generator(board_size, seed=board_size, min_backtracks=1).generate()
+            dlx_board, _ = Solver().solve(new_board(BOARD_TYPES['board'], queens_cells), method='dlx')
+            with self.subTest(board_size=board_size):
+                solved_board, solution = Solver(propagate=False).solve(new_board(BOARD_TYPES['bitboard'], queens_cells), method='parallel')
+                self.assertTrue(solution)
+                self.assertEqual(set(solved_board.selected), set(dlx_board.selected))
+                queens_solver = Solver(propagate=False)
+                solved_board, solution = queens_solver.parallel_search(new_board(BOARD_TYPES['bitboard'], queens_cells), 2, split_nodes=split_nodes)
+                self.assertTrue(solution)
+                self.assertEqual(set(solved_board.selected), set(dlx_board.selected))
+        self.assertGreater(queens_solver.pool_tasks, 0)
+
+class CachedHistoryTest(unittest.TestCase):
+    def test_cached_board_replays_its_solution(self):
+        queens_cells = Generator(8, seed=3).generate()
+        cache = SolutionCache(autosave=False)
+        searched_board, _ = Solver(cache=cache).solve(new_board(BOARD_TYPES['board'], queens_cells), history=True)
+        queens_solver = Solver(cache=cache)
+        solved_board, solution = queens_solver.solve(new_board(BOARD_TYPES['board'], queens_cells), history=True)
+        self.assertTrue(solution)
+        self.assertEqual(queens_solver.stats.cache_hits, 1)
+        self.assertEqual(queens_solver.stats.nodes, 0)
+        self.assertEqual(set(solved_board.selected), set(searched_board.selected))
+        frames = list(queens_solver.move_history)
+        self.assertEqual(len(frames), 9)
+        self.assertEqual(frames[0]['selected'], set())
+        self.assertEqual(frames[-1]['selected'], set(searched_board.selected))
+        self.assertEqual(frames[-1]['status'], 0)
+
+if __name__ == '__main__':
+    unittest.main()